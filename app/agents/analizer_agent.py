@@ -1,12 +1,60 @@
-import pandas as pd
-from langchain.agents import initialize_agent, AgentType
-from langchain_community.chat_models import ChatOpenAI
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+from langchain.prompts import PromptTemplate
 from app.config.config import settings
+from app.utils.strategy import calculate_all_indicators, calculate_vtr
+from app.utils.indicator_state import IndicatorStates
 from app.tools.strategy_tool import (
     rsi_tool, macd_tool, sma_tool, bollinger_tool,
-    adx_tool, vtr_tool, risk_tool, stochastic_tool
+    adx_tool, vtr_tool, risk_tool, stochastic_tool, all_indicators_tool
 )
 
+logger = logging.getLogger(__name__)
+
+# Fewest ticks needed before the indicators are worth running
+_MIN_WINDOW = 14
+
+# Number of memoized analyses kept per product
+_CACHE_SIZE = 32
+# Only analyses slower than this are worth caching (50µs)
+_MIN_CACHE_NS = 50_000
+
+# Indicator signal -> vote code, and final signal indexed by (vote + 1)
+_SIGNAL_CODES = {"BUY": 1, "SELL": -1}
+_CODE = ("SELL", "HOLD", "BUY")
+
+# "<indicator>: <signal>" line of the LLM summary
+_SUMMARY_FMT = "{}: {}".format
+
+# Maximum number of LLM requests in flight at once
+_LLM_CONCURRENCY = 8
+
+_PROMPT_TEMPLATE = """
+Here is the technical analysis for the market data:
+
+{analysis_summary}
+
+Based on this analysis, provide a final trading signal (BUY, SELL, or HOLD).
+Consider the following:
+- A BUY signal requires at least 3 indicators confirming.
+- A SELL signal requires at least 3 indicators confirming.
+- Any other situation should result in a HOLD signal.
+
+The user has an account balance of ${account_balance}, and the current price is {price}.
+Based on a {risk_threshold}% risk threshold, the position size is {position_size} units of the asset.
+
+Please provide a final recommendation:
+1. Should the user execute a BUY or SELL trade?
+2. If so, what position size is recommended based on the risk management calculation?
+
+The final signal should include a brief explanation of why the signal was chosen (considering both the technical analysis and risk management).
+"""
+
 class AnalyzerAgent:
     def __init__(self, secret_api_key: str):
         """
@@ -17,17 +65,37 @@ class AnalyzerAgent:
         # List of technical analysis tools
         self.tools = [
             rsi_tool, macd_tool, sma_tool, bollinger_tool,
-            adx_tool, vtr_tool, risk_tool, stochastic_tool
+            adx_tool, vtr_tool, risk_tool, stochastic_tool, all_indicators_tool
         ]
 
-        # Initialize LangChain agent with LLM
-        self.llm = ChatOpenAI(openai_api_key=settings.open_api_key)
-        self.agent = self._initialize_agent()
+        # Initialize the LLM; replies are short, so cap the tokens
+        from langchain_community.chat_models import ChatOpenAI
+
+        self.llm = ChatOpenAI(openai_api_key=settings.open_api_key, streaming=True, max_tokens=64)
+
+        # Prompt is compiled once; only the variables are substituted per call
+        self.prompt = PromptTemplate.from_template(_PROMPT_TEMPLATE)
+        self._llm_sem = asyncio.Semaphore(_LLM_CONCURRENCY)
+
+        # Memoized results per product, keyed on the latest tick
+        self._last_analysis = {}
+
+        # Incremental RSI/MACD/SMA/Bollinger state per product
+        self.indicator_states = {}
+
+    @cached_property
+    def agent(self):
+        """
+        LangChain agent over the tools. analyze() only needs the LLM, so it is built on first access.
+        """
+        return self._initialize_agent()
 
     def _initialize_agent(self):
         """
         Initializes the agent using the tools and LLM.
         """
+        from langchain.agents import initialize_agent, AgentType
+
         return initialize_agent(
             tools=self.tools,
             llm=self.llm,
@@ -35,76 +103,123 @@ class AnalyzerAgent:
             verbose=True
         )
 
-    def analyze(self, historical_data, account_balance, risk_threshold=2):
+    def update_indicators(self, product_id, close, high, low):
         """
-        Analyzes market data using technical indicators and returns a trading signal.
-        Integrates risk management (position size) based on account balance and risk threshold using the risk_tool.
+        Feeds a new tick into the product's incremental indicators; call once per tick before analyze.
         """
-        # Convert historical data to DataFrame
-        historical_df = pd.DataFrame(historical_data)
+        states = self.indicator_states.get(product_id)
+        if states is None:
+            states = self.indicator_states[product_id] = IndicatorStates()
+        states.update(close, high, low)
 
-        # Ensure there's enough data for calculations
-        if len(historical_df) < 14:
-            return {"final_signal": "HOLD", "indicators": "Insufficient data"}
+    def reset_indicators(self, product_id):
+        """
+        Drops the product's incremental indicators, e.g. when its tick buffer restarts after a reconnect.
+        """
+        self.indicator_states.pop(product_id, None)
 
-        # Run all technical indicators
-        analysis_results = {
-            "RSI": rsi_tool._run(historical_df, config=None),
-            "MACD": macd_tool._run(historical_df, config=None),
-            "SMA": sma_tool._run(historical_df, config=None),
-            "Bollinger Bands": bollinger_tool._run(historical_df, config=None),
-            "VTR (Volatility)": vtr_tool._run(historical_df, config=None),
-            "Stochastic": stochastic_tool._run(historical_df, config=None)
+    def state_signals(self, product_id):
+        """
+        Snapshot of the product's incremental RSI/MACD/SMA/Bollinger/Stochastic signals, or None
+        when it has no state yet. Take it together with the window copy, so both describe one tick.
+        """
+        states = self.indicator_states.get(product_id)
+        if states is None:
+            return None
+        return {
+            "RSI": states.rsi.signal(),
+            "MACD": states.macd.signal(),
+            "SMA": states.sma.signal(),
+            "Bollinger Bands": states.bollinger.signal(),
+            "Stochastic": states.stochastic.signal(),
         }
 
-        # Prepare a textual summary of the analysis
-        analysis_summary = "\n".join([f"{key}: {value[0]}" for key, value in analysis_results.items()])
+    def _position_size(self, account_balance, price, risk_threshold):
+        """
+        Same result as risk_tool (check_risk), without the LangChain tool dispatch on the hot path.
+        """
+        if account_balance <= 0 or price <= 0:
+            return None
+        return account_balance * risk_threshold / 100 / float(price)
 
-        # Determine BUY/SELL signal based on technical analysis
-        buy_signals = sum(1 for key, value in analysis_results.items() if value[0] == "BUY")
-        sell_signals = sum(1 for key, value in analysis_results.items() if value[0] == "SELL")
+    async def analyze(self, close, high, low, volume, account_balance, risk_threshold=2,
+                      product_id=None, timestamp=None, state_signals=None):
+        """
+        Analyzes market data using technical indicators and returns a trading signal.
+        Takes the product's chronological close/high/low/volume arrays, e.g. from a ring-buffer window,
+        and optionally the state_signals() snapshot taken at the same tick.
+        Results are memoized per product on the latest tick's (timestamp, close), so duplicated
+        ticker events do not rerun the whole indicator pipeline.
+        """
+        # Ensure there's enough data for calculations before doing any other work
+        if len(close) < _MIN_WINDOW:
+            return {"final_signal": "HOLD", "indicators": "Insufficient data"}
 
-        if buy_signals >= 3:
-            analyzer_signal = "BUY"
-        elif sell_signals >= 3:
-            analyzer_signal = "SELL"
-        else:
-            analyzer_signal = "HOLD"
+        cache_key = (timestamp, close[-1], account_balance, risk_threshold)
+        cache = self._last_analysis.setdefault(product_id, OrderedDict())
+        if cache_key in cache:
+            cache.move_to_end(cache_key)
+            return cache[cache_key]
 
-        # Integrate risk management using the risk_tool to determine position size
-        status, position_size = risk_tool.func(account_balance, historical_df['close'].iloc[-1], risk_threshold)
+        started = time.perf_counter_ns()
+        window = {"close": close, "high": high, "low": low, "volume": volume}
+        result = await self._analyze(window, account_balance, risk_threshold, product_id, state_signals)
 
-        if position_size is None:
-            return {"final_signal": "HOLD", "message": "Invalid input for position size calculation"}
+        # Cheap calls are not worth the cache slot
+        if time.perf_counter_ns() - started >= _MIN_CACHE_NS:
+            cache[cache_key] = result
+            if len(cache) > _CACHE_SIZE:
+                cache.popitem(last=False)
+        return result
 
-        # Create a prompt for the LLM to evaluate and suggest a final signal based on the analysis
-        prompt = f"""
-               Here is the technical analysis for the market data:
+    async def _analyze(self, window, account_balance, risk_threshold, product_id=None, state_signals=None):
+        """
+        Runs the indicators and risk management for one product, then asks the LLM to confirm
+        any BUY/SELL signal.
+        """
+        # Indicator math is CPU-bound, keep it off the event loop
+        analysis_results = await asyncio.to_thread(self._run_indicators, window, state_signals)
 
-               {analysis_summary}
+        last_close = window["close"][-1]
 
-               Based on this analysis, provide a final trading signal (BUY, SELL, or HOLD).
-               Consider the following:
-               - A BUY signal requires at least 3 indicators confirming.
-               - A SELL signal requires at least 3 indicators confirming.
-               - Any other situation should result in a HOLD signal.
+        # Prepare a textual summary of the analysis
+        analysis_summary = "\n".join(
+            map(_SUMMARY_FMT, analysis_results.keys(), [value[0] for value in analysis_results.values()])
+        )
+
+        # Determine BUY/SELL signal based on technical analysis (3 confirmations, BUY wins ties)
+        signals = np.fromiter(
+            (_SIGNAL_CODES.get(value[0], 0) for value in analysis_results.values()),
+            dtype=np.int8, count=len(analysis_results)
+        )
+        buy = int((signals == 1).sum())
+        sell = int((signals == -1).sum())
+        analyzer_signal = _CODE[(buy >= 3) - ((sell >= 3) & (buy < 3)) + 1]
+
+        # Integrate risk management to determine position size
+        position_size = self._position_size(account_balance, last_close, risk_threshold)
 
-               The user has an account balance of ${account_balance}, and the current price is {historical_df['close'].iloc[-1]}.
-               Based on a {risk_threshold}% risk threshold, the position size is {position_size} units of the asset.
+        if position_size is None:
+            return {"final_signal": "HOLD", "message": "Invalid input for position size calculation"}
 
-               Please provide a final recommendation:
-               1. Should the user execute a BUY or SELL trade?
-               2. If so, what position size is recommended based on the risk management calculation?
+        # The rules already dictate HOLD, so only BUY/SELL signals are worth an LLM round trip
+        if analyzer_signal != "HOLD":
+            prompt = self.prompt.format(
+                analysis_summary=analysis_summary,
+                account_balance=account_balance,
+                price=last_close,
+                risk_threshold=risk_threshold,
+                position_size=position_size
+            )
 
-               The final signal should include a brief explanation of why the signal was chosen (considering both the technical analysis and risk management).
-               """
+            # Send the prompt to the LLM for evaluation
+            async with self._llm_sem:
+                llm_response = await self.llm.ainvoke(prompt)
 
-        # Send the prompt to the LLM for evaluation
-        llm_response = self.llm.predict(prompt)
+            # Extract the final signal and explanation from the LLM's response
+            llm_signal = llm_response.content.strip()  # Clean the response
+            logger.info("LLM signal for %s: %s", product_id, llm_signal)
 
-        # Extract the final signal and explanation from the LLM's response
-        llm_signal = llm_response.strip()  # Clean the response
-        print(llm_signal)
         # Return both the analyzer signal and the LLM's signal with explanation
         return {
             "analyzer_signal": analyzer_signal,
@@ -113,3 +228,24 @@ class AnalyzerAgent:
             "indicators": analysis_results
         }
 
+    def _run_indicators(self, window, state_signals=None):
+        """
+        Runs the technical indicators for one product.
+        The window is a dict of NumPy columns which the indicators read directly, no DataFrame needed.
+        When the product has incremental state, RSI, MACD, SMA, Bollinger and Stochastic come from
+        `state_signals` (snapshotted with the window) and only the volatility is computed from the window;
+        otherwise every indicator comes from one fused pass over the window.
+        """
+        if state_signals is None:
+            # Run all technical indicators in a single JIT-compiled walk over the buffer
+            # rather than going through the LangChain tool plumbing on every tick
+            return calculate_all_indicators(window)
+
+        return {
+            "RSI": state_signals["RSI"],
+            "MACD": state_signals["MACD"],
+            "SMA": state_signals["SMA"],
+            "Bollinger Bands": state_signals["Bollinger Bands"],
+            "VTR (Volatility)": calculate_vtr(window),
+            "Stochastic": state_signals["Stochastic"],
+        }
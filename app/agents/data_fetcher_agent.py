@@ -1,16 +1,32 @@
 import asyncio
-import json
-import numpy as np
 import logging
-from collections import deque
+from functools import cached_property
+from typing import TYPE_CHECKING
 
+import orjson
 import websockets
-from langchain.agents import Tool, AgentExecutor, initialize_agent, AgentType
-from langchain_community.chat_models import ChatOpenAI
 
 from app.agents.analizer_agent import AnalyzerAgent
 from app.config.config import settings
 from app.tools.data_fetcher_tool import DataFetcherTool
+from app.utils.tick_buffer import new_tick_buffer, append_tick, parse_timestamp, buffer_window, latest_timestamp
+
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+
+logger = logging.getLogger(__name__)
+
+# How long the analysis worker waits for a burst of ticks to settle (seconds)
+_DEBOUNCE_SECONDS = 0.05
+
+# Only every Nth analysis result is logged at INFO, the rest go to DEBUG
+_LOG_SAMPLE_EVERY = 100
+
+# One line of the batched LLM input, filled from the product ID and its analyze() result
+_BATCH_LINE_FMT = (
+    "Product: {product_id}, Indicators: {indicators}, Analysis Signal: {analyzer_signal}, "
+    "Position Size: {position_size}\n"
+)
 
 
 class DataFetcherAgent:
@@ -22,7 +38,12 @@ class DataFetcherAgent:
         self.secret_api_key = secret_api_key
         self.websocket_url = "wss://advanced-trade-ws.coinbase.com"
         self.analyzer_agent = AnalyzerAgent(secret_api_key)
-        self.historical_data = {}  # Store historical data for each product ID
+        self.historical_data = {}  # Ring buffer of recent ticks for each product ID
+        self._dirty = set()  # Products with ticks not analyzed yet
+        self._tick_event = asyncio.Event()  # Set when a product becomes dirty
+        self._last_price = {}  # product_id -> (price, high_24_h) of the last accepted tick
+        self._last_seq = {}  # product_id -> sequence_num of the last accepted message
+        self._log_ctr = 0  # Analysis results produced, drives the INFO log sampling
         # Initialize the DataFetcherTool
         self.data_fetcher_tool = DataFetcherTool(
             name="coinbase_data_fetcher",
@@ -31,18 +52,26 @@ class DataFetcherAgent:
         )
 
         # Initialize the LLM for agent reasoning (can be ChatOpenAI, for example)
+        from langchain_community.chat_models import ChatOpenAI
+
         self.llm = ChatOpenAI(openai_api_key=settings.open_api_key)
 
         # Initialize agent tools (currently using only DataFetcherTool)
         self.tools = [self.data_fetcher_tool]
 
-        # Set up a simple agent executor
-        self.agent = self._initialize_agent()
+    @cached_property
+    def agent(self) -> "AgentExecutor":
+        """
+        Simple agent executor, built on first use by run() since streaming and fetching never need it.
+        """
+        return self._initialize_agent()
 
-    def _initialize_agent(self) -> AgentExecutor:
+    def _initialize_agent(self) -> "AgentExecutor":
         """
         Initializes the agent using the tools and LLM.
         """
+        from langchain.agents import initialize_agent, AgentType
+
         # Create an agent that can use the data fetcher tool
         agent = initialize_agent(
             tools=self.tools,
@@ -76,72 +105,156 @@ class DataFetcherAgent:
             logging.error(f"Error running agent: {e}")
             return str(e)
 
+    def window(self, product_id: str, copy: bool = False) -> dict:
+        """
+        Returns the product's buffered ticks in chronological order as close/high/low/volume arrays.
+        Zero-copy until the ring buffer wraps; afterwards a single concatenate per column.
+        """
+        return buffer_window(self.historical_data[product_id], copy=copy)
+
     async def stream_market_data(self, product_ids: list):
-        """Subscribe to live trade updates using Coinbase WebSocket API and batch the signals."""
-        batch_size = 5  # Number of products to process in each batch
-        current_batch = []
+        """
+        Subscribe to live trade updates using Coinbase WebSocket API and batch the signals.
+        The read loop only records ticks; analysis runs in a separate coalescing worker.
+        """
+        worker = asyncio.create_task(self._analyze_worker())
+        try:
+            await self._read_market_data(product_ids)
+        finally:
+            worker.cancel()
 
+    async def _read_market_data(self, product_ids: list):
+        """Receives ticker messages, writes them into the ring buffers and marks products dirty."""
         while True:
             try:
-                async with websockets.connect(self.websocket_url) as ws:
+                async with websockets.connect(
+                    self.websocket_url,
+                    max_size=2 ** 20,
+                    compression=None,
+                    ping_interval=20,
+                    ping_timeout=20
+                ) as ws:
                     # Subscribe to ticker updates
                     subscribe_message = {
                         "type": "subscribe",
                         "channel": "ticker",
                         "product_ids": product_ids
                     }
-                    await ws.send(json.dumps(subscribe_message))
-                    print(f"Subscribed to {product_ids} live feed!")
+                    await ws.send(orjson.dumps(subscribe_message).decode())
+                    logger.info("Subscribed to %s live feed!", product_ids)
 
-                    # Initialize historical data storage for each product ID
+                    # Initialize historical data storage for each product ID; the incremental
+                    # indicators restart with it, so they never span a disconnect gap
                     for product_id in product_ids:
-                        self.historical_data[product_id] = deque(maxlen=100)  # Store up to 100 data points
+                        self.historical_data[product_id] = new_tick_buffer(100)  # Store up to 100 data points
+                        self.analyzer_agent.reset_indicators(product_id)
+                    # Buffers start empty and sequence numbers restart with every connection
+                    self._last_seq.clear()
+                    self._last_price.clear()
 
                     # Receive and process messages
                     async for message in ws:
-                        data = json.loads(message)
+                        data = orjson.loads(message)
                         if data.get("channel") == "ticker":
                             tickers = data.get("events", [])[0].get("tickers", [])
                             for ticker in tickers:
                                 product_id = ticker.get("product_id")
                                 if product_id in self.historical_data:
-                                    # Append new data to historical data
-                                    self.historical_data[product_id].append({
-                                        "timestamp": data.get("timestamp"),
-                                        "close": float(ticker.get("price", 0)),
-                                        "high": float(ticker.get("high_24_h", 0)),
-                                        "low": float(ticker.get("low_24_h", 0)),
-                                        "volume": float(ticker.get("volume_24_h", 0))
-                                    })
-
-                                    # Analyze the data for the current product
-                                    signal = self.analyzer_agent.analyze(
-                                        list(self.historical_data[product_id]), account_balance=1000, risk_threshold=2
-                                    )
-                                    print(signal)
-                                    if signal.get("message") or signal.get('indicators') == "Insufficient data":
+                                    # Drop out-of-order messages
+                                    sequence_num = data.get("sequence_num")
+                                    if sequence_num is not None:
+                                        if sequence_num <= self._last_seq.get(product_id, -1):
+                                            continue
+                                        self._last_seq[product_id] = sequence_num
+
+                                    close = float(ticker.get("price", 0))
+                                    high = float(ticker.get("high_24_h", 0))
+                                    low = float(ticker.get("low_24_h", 0))
+                                    if close <= 0:
+                                        logger.warning("Received invalid close price for %s.", product_id)
+                                        continue  # Skip invalid entries
+
+                                    # Heartbeats and micro-updates repeat the last price; nothing to recompute
+                                    if self._last_price.get(product_id) == (close, high):
                                         continue
+                                    self._last_price[product_id] = (close, high)
+
+                                    # Write the new tick into the product's ring buffer
+                                    append_tick(
+                                        self.historical_data[product_id],
+                                        close=close,
+                                        high=high,
+                                        low=low,
+                                        volume=float(ticker.get("volume_24_h", 0)),
+                                        ts=parse_timestamp(data.get("timestamp"))
+                                    )
+                                    # Advance the incremental indicators by one tick
+                                    self.analyzer_agent.update_indicators(product_id, close, high, low)
 
-                                    # Add the signal to the current batch
-                                    # current_batch.append({
-                                    #     "product_id": product_id,
-                                    #     "signal": signal
-                                    # })
-                                    #
-                                    # # If the batch is full, send it to the LLM
-                                    # if len(current_batch) >= batch_size:
-                                    #     llm_input = self.create_batch_input(current_batch)
-                                    #     llm_call_result = await self.llm_call(input_text=llm_input)
-                                    #     print(f"Generated Signal for batch: {llm_call_result}")
-                                    #
-                                    #     # Clear the batch after processing
-                                    #     current_batch.clear()
+                                    # Hand the product to the analysis worker
+                                    self._dirty.add(product_id)
+                                    self._tick_event.set()
 
                 # Handle WebSocket reconnection logic
             except websockets.exceptions.ConnectionClosed:
-                print("WebSocket disconnected. Reconnecting...")
+                logger.warning("WebSocket disconnected. Reconnecting...")
                 await asyncio.sleep(5)
 
+    async def _analyze_worker(self):
+        """
+        Analyzes every product that received ticks since the last pass, at most once per pass,
+        running the analyses concurrently (indicator math runs on the default thread pool).
+        """
+        batch_size = 5  # Number of products to process in each batch
+        current_batch = []
+
+        while True:
+            await self._tick_event.wait()
+            await asyncio.sleep(_DEBOUNCE_SECONDS)  # Let a burst of ticks coalesce
+            self._tick_event.clear()
+            product_ids = list(self._dirty)
+            self._dirty.clear()
+
+            # Indicators run on worker threads while the read loop keeps writing into the
+            # ring buffers and advancing the incremental states, so the window, its timestamp and
+            # the state signals are all snapshotted here, in one step of the event loop
+            signals = await asyncio.gather(*[
+                self.analyzer_agent.analyze(
+                    **self.window(product_id, copy=True),
+                    account_balance=1000, risk_threshold=2, product_id=product_id,
+                    timestamp=latest_timestamp(self.historical_data[product_id]),
+                    state_signals=self.analyzer_agent.state_signals(product_id)
+                )
+                for product_id in product_ids
+            ], return_exceptions=True)
+
+            for product_id, signal in zip(product_ids, signals):
+                if isinstance(signal, Exception):
+                    logger.error("Error analyzing %s: %s", product_id, signal)
+                    continue
+                self._log_ctr += 1
+                if self._log_ctr % _LOG_SAMPLE_EVERY == 0:
+                    logger.info("signal %s %s", product_id, signal)
+                else:
+                    logger.debug("signal %s %s", product_id, signal)
+                if signal.get("message") or signal.get('indicators') == "Insufficient data":
+                    continue
+
+                # Add the signal to the current batch
+                # current_batch.append({
+                #     "product_id": product_id,
+                #     "signal": signal
+                # })
+                #
+                # # If the batch is full, send it to the LLM
+                # if len(current_batch) >= batch_size:
+                #     llm_input = self.create_batch_input(current_batch)
+                #     llm_call_result = await self.llm_call(input_text=llm_input)
+                #     print(f"Generated Signal for batch: {llm_call_result}")
+                #
+                #     # Clear the batch after processing
+                #     current_batch.clear()
+
     async def llm_call(self, input_text: str) -> str:
         """
         Interacts with the LLM to generate a final decision based on technical analysis for a batch of signals.
@@ -163,12 +276,9 @@ class DataFetcherAgent:
         """
         Creates a combined input string for the batch of signals to be processed by the LLM.
         """
-        batch_input = ""
-        for item in batch:
-            product_id = item["product_id"]
-            signal = item["signal"]
-            llm_input = f"Product: {product_id}, Indicators: {signal['indicators']}, Analysis Signal: {signal['analyzer_signal']}, LLM Signal: {signal['llm_signal']}, Position Size: {signal['position_size']}\n"
-            batch_input += llm_input
-
-        return batch_input
+        # Build all lines first and join once, instead of growing a string in the loop
+        return "".join([
+            _BATCH_LINE_FMT.format(product_id=item["product_id"], **item["signal"])
+            for item in batch
+        ])
 
@@ -0,0 +1,176 @@
+import numpy as np
+
+from app.utils._njit import njit
+
+
+@njit(cache=True, nogil=True)
+def ewm_mean(values, span):
+    """
+    Exponential moving average as a plain recurrence, s[i] = alpha * x[i] + (1 - alpha) * s[i - 1].
+    Equivalent to Series.ewm(span=span, adjust=False).mean() on NaN-free data.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty(len(values))
+    if len(values) == 0:
+        return out
+    ema = values[0]
+    out[0] = ema
+    for i in range(1, len(values)):
+        ema = alpha * values[i] + (1.0 - alpha) * ema
+        out[i] = ema
+    return out
+
+
+@njit(cache=True, nogil=True)
+def wilder_mean(values, period):
+    """
+    Wilder's smoothing (RMA): avg = (avg * (period - 1) + x) / period, i.e. an EMA with alpha = 1 / period.
+    Seeded with the mean of the first `period` values after any leading NaNs; NaN until then.
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    start = 0
+    while start < n and np.isnan(values[start]):
+        start += 1
+    if n - start < period:
+        return out
+    avg = values[start:start + period].mean()
+    out[start + period - 1] = avg
+    for i in range(start + period, n):
+        avg = (avg * (period - 1) + values[i]) / period
+        out[i] = avg
+    return out
+
+
+@njit(cache=True, nogil=True)
+def rolling_max(values, window):
+    """
+    Rolling maximum over `window` NaN-free values in O(n) with a monotonic deque of indices,
+    NaN-padded like rolling(window).max().
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    idx = np.empty(n, dtype=np.int64)  # Indices of decreasing values, idx[head] is the maximum
+    head = tail = 0
+    for i in range(n):
+        while tail > head and values[idx[tail - 1]] <= values[i]:
+            tail -= 1
+        idx[tail] = i
+        tail += 1
+        if idx[head] <= i - window:
+            head += 1
+        if i >= window - 1:
+            out[i] = values[idx[head]]
+    return out
+
+
+def rolling_min(values, window):
+    """
+    Rolling minimum, the mirror image of rolling_max.
+    """
+    return -rolling_max(-values, window)
+
+
+@njit(cache=True, nogil=True)
+def _indicators_kernel(close, high, low, period):
+    """
+    Computes every MarketAnalyzer indicator in one pass over the close/high/low arrays.
+    Returns (rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr, stochastic),
+    matching the methods in MarketAnalyzer, NaN-padded where they are undefined.
+    """
+    n = len(close)
+    rsi = np.full(n, np.nan)
+    sma = np.full(n, np.nan)
+    vtr = np.full(n, np.nan)
+    upper_band = np.full(n, np.nan)
+    lower_band = np.full(n, np.nan)
+    stochastic = np.full(n, np.nan)
+    macd = ewm_mean(close, 12) - ewm_mean(close, 26)
+    signal_line = ewm_mean(macd, 9)
+
+    gain = np.full(n, np.nan)
+    loss = np.full(n, np.nan)
+    tr = np.empty(n)
+    plus_dm = np.zeros(n)
+    minus_dm = np.zeros(n)
+    close_sum = 0.0
+    # Monotonic deques of indices for the rolling low minimum and high maximum
+    min_idx = np.empty(n, dtype=np.int64)
+    max_idx = np.empty(n, dtype=np.int64)
+    min_head = min_tail = max_head = max_tail = 0
+
+    for i in range(n):
+        # SMA, Bollinger Bands and VTR
+        close_sum += close[i]
+        if i >= period:
+            close_sum -= close[i - period]
+        if i >= period - 1:
+            mean = close_sum / period
+            sq = 0.0
+            for j in range(i - period + 1, i + 1):
+                sq += (close[j] - mean) ** 2
+            std = np.sqrt(sq / (period - 1))
+            sma[i] = mean
+            vtr[i] = std
+            upper_band[i] = mean + std * 2
+            lower_band[i] = mean - std * 2
+
+        # Stochastic: rolling min of lows and max of highs via the monotonic deques
+        while min_tail > min_head and low[min_idx[min_tail - 1]] >= low[i]:
+            min_tail -= 1
+        min_idx[min_tail] = i
+        min_tail += 1
+        while max_tail > max_head and high[max_idx[max_tail - 1]] <= high[i]:
+            max_tail -= 1
+        max_idx[max_tail] = i
+        max_tail += 1
+        if min_idx[min_head] <= i - period:
+            min_head += 1
+        if max_idx[max_head] <= i - period:
+            max_head += 1
+        if i >= period - 1:
+            low_min = low[min_idx[min_head]]
+            spread = high[max_idx[max_head]] - low_min
+            if spread != 0:
+                stochastic[i] = 100 * (close[i] - low_min) / spread
+            elif close[i] != low_min:
+                stochastic[i] = np.inf if close[i] > low_min else -np.inf
+
+        # RSI gains/losses, true range and directional movement
+        tr[i] = high[i] - low[i]
+        if i > 0:
+            delta = close[i] - close[i - 1]
+            gain[i] = max(delta, 0.0)
+            loss[i] = max(-delta, 0.0)
+            tr[i] = max(tr[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+            up = high[i] - high[i - 1]
+            down = low[i - 1] - low[i]
+            if up > down and up > 0:
+                plus_dm[i] = up
+            if down > up and down > 0:
+                minus_dm[i] = down
+
+    # RSI from Wilder-smoothed gains and losses
+    avg_gain = wilder_mean(gain, period)
+    avg_loss = wilder_mean(loss, period)
+    for i in range(n):
+        if avg_loss[i] > 0:
+            rsi[i] = 100 - 100 / (1 + avg_gain[i] / avg_loss[i])
+        elif avg_gain[i] > 0:
+            rsi[i] = 100.0
+
+    # ADX from Wilder-smoothed TR and DM
+    atr = wilder_mean(tr, period)
+    plus_avg = wilder_mean(plus_dm, period)
+    minus_avg = wilder_mean(minus_dm, period)
+    dx = np.full(n, np.nan)
+    for i in range(n):
+        if np.isnan(atr[i]):
+            continue
+        plus_di = 100 * plus_avg[i] / atr[i] if atr[i] != 0 else 0.0
+        minus_di = 100 * minus_avg[i] / atr[i] if atr[i] != 0 else 0.0
+        di_sum = plus_di + minus_di
+        dx[i] = 100 * abs(plus_di - minus_di) / di_sum if di_sum != 0 else 0.0
+    adx = wilder_mean(dx, period)
+
+    return rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr, stochastic
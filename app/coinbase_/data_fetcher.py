@@ -1,10 +1,12 @@
 import asyncio
 import json
+import time
 from datetime import datetime, timedelta
 
-import pandas as pd
+import aiohttp
+import numpy as np
+import orjson
 
-import requests
 import websockets
 from coinbase import jwt_generator
 
@@ -12,23 +14,77 @@ from app.coinbase_.websocket_analyser import WebSocketAnalyzer
 from app.config.config import settings
 from app.models.models import InputParam
 
+# Coinbase JWTs expire after 120s; reuse a signed token for a bit less than that
+_JWT_TTL_SECONDS = 90
+
+# Maximum concurrent REST requests, to stay within Coinbase rate limits
+_MAX_CONCURRENT_REQUESTS = 8
+
+# Candle fields as returned by the candles endpoint, parsed straight into float64 columns
+_CANDLE_FIELDS = ("low", "high", "open", "close", "volume")
+
+
+def _parse_candles(candles: list) -> dict:
+    """Converts the JSON candle list (numeric strings) into a dict of contiguous float64 arrays."""
+    # Missing values become NaN, like pd.to_numeric(errors="coerce")
+    return {
+        field: np.array([candle.get(field) for candle in candles], dtype=np.float64)
+        for field in _CANDLE_FIELDS
+    }
+
 
 class DataFetcher:
     def __init__(self, api_key: str, api_secret: str):
         self.api_key = api_key
         self.api_secret = api_secret
         self.websocket_url = "wss://advanced-trade-ws.coinbase.com"
+        self._session = None  # Shared aiohttp session, created lazily
+        self._session_loop = None  # Event loop the session is bound to
+        self._request_slots = None  # Semaphore bounding in-flight requests, bound to the same loop
+        self._jwt_cache = {}  # (method, path) -> (signed_at, token)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Returns the pooled keep-alive session, creating it on first use or when the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session_loop = loop
+            self._request_slots = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS)
+            connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=75)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                json_serialize=lambda obj: orjson.dumps(obj).decode()
+            )
+        return self._session
+
+    async def close(self):
+        """Closes the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        """Sends a request over the shared session and decodes the JSON body with orjson."""
+        session = self._get_session()
+        async with self._request_slots:
+            async with session.request(method, url, **kwargs) as response:
+                response.raise_for_status()
+                return orjson.loads(await response.read())
 
     def generate_jwt(self, request_method: str, request_path: str) -> str:
-        """Generates a JWT for authenticating requests."""
+        """Generates a JWT for authenticating requests, reusing a recent token for the same endpoint."""
+        cache_key = (request_method, request_path)
+        cached = self._jwt_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < _JWT_TTL_SECONDS:
+            return cached[1]
+
         # Format the JWT URI for the request you want to make
         jwt_uri = jwt_generator.format_jwt_uri(request_method, request_path)
 
-        # Generate the JWT token using the API key and secret
+        # Generate the JWT token using the API key and secret (ES256 signing)
         jwt_token = jwt_generator.build_rest_jwt(jwt_uri, self.api_key, self.api_secret)
+        self._jwt_cache[cache_key] = (time.monotonic(), jwt_token)
         return jwt_token
 
-    def get_product_details(self, product_id: str, get_tradability_status: bool = False) -> dict:
+    async def get_product_details(self, product_id: str, get_tradability_status: bool = False) -> dict:
         """Fetch details of a specific product using its product ID."""
         path = f"/api/v3/brokerage/products/{product_id}"
         url = f"https://api.coinbase.com{path}"
@@ -41,23 +97,17 @@ class DataFetcher:
         }
 
         try:
-            response = requests.get(url + params, headers=headers)
-            response.raise_for_status()
-            return response.json()  # Return product details as a JSON object
-        except requests.exceptions.RequestException as e:
+            return await self._request("GET", url + params, headers=headers)  # Return product details as a JSON object
+        except aiohttp.ClientError as e:
             return {"error": str(e)}
 
-    def get_top_us_crypto_details(self, product_ids: list) -> dict:
+    async def get_top_us_crypto_details(self, product_ids: list) -> dict:
         """Fetch details for a list of top US-based cryptocurrencies."""
-        crypto_details = {}
-
-        for product_id in product_ids:
-            details = self.get_product_details(product_id)  # Fetch product details
-            crypto_details[product_id] = details  # Store details in dictionary
+        # Fetch all product details concurrently over the pooled connections
+        details = await asyncio.gather(*[self.get_product_details(product_id) for product_id in product_ids])
+        return dict(zip(product_ids, details))
 
-        return crypto_details
-
-    def get_market_trades(self, product_id: str, limit: int = 5) -> dict:
+    async def get_market_trades(self, product_id: str, limit: int = 5) -> dict:
         """Fetches recent market trades and best bid/ask for a given product."""
         url = f"https://api.coinbase.com/api/v3/brokerage/products/{product_id}/ticker?limit={limit}"
         path = f"/api/v3/brokerage/products/{product_id}/ticker"
@@ -66,16 +116,15 @@ class DataFetcher:
         headers = {"Authorization": f"Bearer {jwt_token}"}
 
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self._request("GET", url, headers=headers)
+        except aiohttp.ClientError as e:
             return {"error": str(e)}
 
 
-    def fetch_historical_data(self, params: InputParam):
+    async def fetch_historical_data(self, params: InputParam):
         """
         Fetch historical candlestick (OHLC) data from Coinbase.
+        Returns a dict of float64 NumPy arrays keyed low/high/open/close/volume.
         """
         # Determine the time range (start_time, end_time)
         end_time = params.end_time or datetime.utcnow()
@@ -102,23 +151,15 @@ class DataFetcher:
 
         try:
             # Send the GET request to fetch the historical data
-            response = requests.get(url, headers=headers, params=query_params)
-            response.raise_for_status()
-
-            # Process and return the data
-            data = response.json().get("candles")
-            df = pd.DataFrame(data, columns=["low", "high", "open", "close", "volume"])
+            response = await self._request("GET", url, headers=headers, params=query_params)
 
-            # Ensure that the 'close' column is numeric for analysis
-            df["close"] = pd.to_numeric(df["close"], errors="coerce")
-            df["high"] = pd.to_numeric(df["high"], errors="coerce")
-            df["low"] = pd.to_numeric(df["low"], errors="coerce")
-            return df  # Return the processed data
+            # Process and return the data as typed NumPy columns
+            return _parse_candles(response.get("candles") or [])
 
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientError as e:
             print(f"Error fetching data: {e}")
             return {"error": str(e)}
-    def get_all_products(self, limit: int = 10, get_all_products: bool = True) -> list:
+    async def get_all_products(self, limit: int = 10, get_all_products: bool = True) -> list:
         """Fetch the list of all available products using the Coinbase brokerage REST API."""
         url = "https://api.coinbase.com/api/v3/brokerage/products"
         path = "/api/v3/brokerage/products"
@@ -132,33 +173,31 @@ class DataFetcher:
         }
 
         try:
-            response = requests.get(url + params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+            data = await self._request("GET", url + params, headers=headers)
             return data["products"]
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientError as e:
             return {"error": str(e)}
 
-    def get_multiple_product_details_and_history(self, product_ids: list, granularity: str = "ONE_DAY") -> dict:
+    async def get_multiple_product_details_and_history(self, product_ids: list, granularity: str = "ONE_DAY") -> dict:
         """Fetch details and historical data for multiple products."""
-        all_product_details = {}
-
-        for product_id in product_ids:
-            # Fetch product details
-            product_details = self.get_product_details(product_id)
-
-            # Fetch historical data
-            historical_data = self.fetch_historical_data(InputParam(product_id=product_id, granularity=granularity))
-
-            # Store the results in the dictionary
-            all_product_details[product_id] = {
+        # Every request is independent, so issue them all at once (bounded by the request semaphore)
+        all_details, all_history = await asyncio.gather(
+            asyncio.gather(*[self.get_product_details(product_id) for product_id in product_ids]),
+            asyncio.gather(*[
+                self.fetch_historical_data(InputParam(product_id=product_id, granularity=granularity))
+                for product_id in product_ids
+            ])
+        )
+
+        return {
+            product_id: {
                 "product_details": product_details,
                 "historical_data": historical_data
             }
+            for product_id, product_details, historical_data in zip(product_ids, all_details, all_history)
+        }
 
-        return all_product_details
-
-    def get_account_balance(self) -> dict:
+    async def get_account_balance(self) -> dict:
         """Fetch the account balance."""
         url = f"https://api.coinbase.com/api/v3/brokerage/accounts"
         path = "/api/v3/brokerage/accounts"
@@ -167,13 +206,11 @@ class DataFetcher:
         headers = {"Authorization": f"Bearer {jwt_token}"}
 
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()  # Return account balance details
-        except requests.exceptions.RequestException as e:
+            return await self._request("GET", url, headers=headers)  # Return account balance details
+        except aiohttp.ClientError as e:
             return {"error": str(e)}
 
-    def place_order(self, product_id: str, side: str, size: float, price: float) -> dict:
+    async def place_order(self, product_id: str, side: str, size: float, price: float) -> dict:
         """Place an order on Coinbase."""
         url = f"https://api.coinbase.com/api/v3/brokerage/orders"
         path = "/api/v3/brokerage/orders"
@@ -195,9 +232,7 @@ class DataFetcher:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=order_data)
-            response.raise_for_status()
-            return response.json()  # Return the order response
-        except requests.exceptions.RequestException as e:
+            return await self._request("POST", url, headers=headers, json=order_data)  # Return the order response
+        except aiohttp.ClientError as e:
             return {"error": str(e)}
 
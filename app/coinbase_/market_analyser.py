@@ -1,8 +1,55 @@
+import logging
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.coinbase_._numba_kernels import ewm_mean, wilder_mean, rolling_min, rolling_max, _indicators_kernel
+
+# The MACD signal line needs the long EMA plus the signal EMA before it means anything
+_MACD_LONG_PERIOD, _MACD_SIGNAL_PERIOD = 26, 9
+
+
+def _rolling_mean(values, window):
+    """
+    Rolling mean over `window` values from a cumulative sum, NaN-padded like rolling(window).mean().
+    The sum is accumulated in float64 whatever the input dtype.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        c = np.zeros(len(values) + 1)
+        np.cumsum(values, dtype=np.float64, out=c[1:])
+        out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+
+def _rolling_std(values, window):
+    """
+    Rolling sample standard deviation (ddof=1), NaN-padded like rolling(window).std().
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = sliding_window_view(values, window).std(axis=1, ddof=1, dtype=np.float64)
+    return out
+
+
+def _last_valid(values, count=1):
+    """
+    Returns the last non-NaN value of an indicator (or the last `count` of them, oldest first),
+    or None when there are fewer than `count`. Accepts a Series or an array.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    if valid.size < count:
+        return None
+    if count == 1:
+        return values[valid[-1]]
+    return values[valid[-count:]]
+
+
 class MarketAnalyzer:
-    def __init__(self, product_details, historical_data, portfolio_value, risk_percentage=0.02, loss_percentage=0.05, period=9):
+    def __init__(self, product_details, historical_data, portfolio_value, risk_percentage=0.02, loss_percentage=0.05, period=9,
+                 dtype=np.float64):
         self.product_details = product_details
         self.historical_data = historical_data
         self.price = float(product_details['price'])
@@ -12,152 +59,176 @@ class MarketAnalyzer:
         self.risk_percentage = risk_percentage
         self.loss_percentage = loss_percentage
         self.period = period
+        self.logger = logging.getLogger(__name__)
+        # Price columns coerced to `dtype` once (JSON data can arrive as object dtype);
+        # the indicators work on these arrays and only wrap results in a Series at the end.
+        # historical_data may be a DataFrame or a dict of arrays as returned by DataFetcher.
+        # dtype=float32 is opt-in: it halves the memory traffic (sums and variances are still
+        # accumulated in float64), but its ~7 significant digits are coarse next to price moves
+        # at BTC levels, so the default and app/main.py stay on float64
+        self._close, self._high, self._low = (
+            np.ascontiguousarray(historical_data[column], dtype=dtype) for column in ('close', 'high', 'low')
+        )
+        self._index = getattr(historical_data, 'index', None)
+        if self._index is None:
+            self._index = pd.RangeIndex(len(self._close))
 
     # 1. Calculate RSI (14-day)
     def calculate_rsi(self):
-        delta = self.historical_data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=self.period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=self.period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        # Wilder's RSI: smoothed gains and losses, seeded with the mean of the first `period` changes
+        # Price changes written into one buffer, then gains/losses from two in-place ufuncs
+        delta = np.empty_like(self._close)
+        delta[:1] = np.nan  # No change before the first close (skipped by the smoothing)
+        np.subtract(self._close[1:], self._close[:-1], out=delta[1:])
+        loss = np.negative(delta)
+        np.maximum(loss, 0.0, out=loss)
+        np.maximum(delta, 0.0, out=delta)
+        gain = wilder_mean(delta, self.period)
+        loss = wilder_mean(loss, self.period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        return pd.Series(rsi, index=self._index)
 
     # 2. Calculate MACD (Moving Average Convergence Divergence)
     def calculate_macd(self, short_period=12, long_period=26, signal_period=9):
-        short_ema = self.historical_data['close'].ewm(span=short_period, adjust=False).mean()
-        long_ema = self.historical_data['close'].ewm(span=long_period, adjust=False).mean()
-        macd = short_ema - long_ema
-        signal_line = macd.ewm(span=signal_period, adjust=False).mean()
-        return macd, signal_line
+        macd = ewm_mean(self._close, short_period) - ewm_mean(self._close, long_period)
+        signal_line = ewm_mean(macd, signal_period)
+        return pd.Series(macd, index=self._index), pd.Series(signal_line, index=self._index)
 
     # 3. Calculate SMA (14-day Simple Moving Average)
     def calculate_sma(self):
-        return self.historical_data['close'].rolling(window=self.period).mean()
+        return pd.Series(_rolling_mean(self._close, self.period), index=self._index)
 
     # 4. Calculate Bollinger Bands (14-day)
     def calculate_bollinger_bands(self, num_std_dev=2):
         sma = self.calculate_sma()
-        rolling_std = self.historical_data['close'].rolling(window=self.period).std()
+        rolling_std = self.calculate_vtr()
         upper_band = sma + (rolling_std * num_std_dev)
         lower_band = sma - (rolling_std * num_std_dev)
         return upper_band, lower_band
 
     # 5. Calculate ADX (14-day Average Directional Index)
     def calculate_adx(self):
-        high = self.historical_data['high']
-        low = self.historical_data['low']
-        close = self.historical_data['close']
+        h, l, c = self._high, self._low, self._close
+        debug = self.logger.isEnabledFor(logging.DEBUG)
 
-        # True Range (TR) calculation
-        tr1 = high - low
-        tr2 = abs(high - close.shift(1))
-        tr3 = abs(low - close.shift(1))
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        # True Range (TR) calculation; fmax skips the missing previous close on the first row
+        prev_close = np.empty_like(c)
+        prev_close[:1] = np.nan
+        prev_close[1:] = c[:-1]
+        tr = np.fmax.reduce([h - l, np.abs(h - prev_close), np.abs(l - prev_close)])
 
-        print("True Range:\n", tr.tail(10))  # Debug
+        if debug:
+            self.logger.debug("True Range:\n%s", pd.Series(tr, index=self._index).tail(10))
 
-        atr = tr.rolling(window=self.period, min_periods=1).mean()
-        atr.fillna(method='bfill', inplace=True)  # Fix NaN issue
+        # Wilder's smoothing (RMA) of TR and DM
+        atr = wilder_mean(tr, self.period)
 
-        print("ATR Data:\n", atr.tail(10))  # Debug
+        if debug:
+            self.logger.debug("ATR Data:\n%s", pd.Series(atr, index=self._index).tail(10))
 
         # Directional Movement (DM) calculation
-        plus_dm = high.diff()
-        minus_dm = low.diff()
-
-        plus_dm = plus_dm.where((plus_dm > minus_dm) & (plus_dm > 0), 0)
-        minus_dm = minus_dm.where((minus_dm > plus_dm) & (minus_dm > 0), 0)
-
-        print("Plus DM:\n", plus_dm.tail(10))  # Debug
-        print("Minus DM:\n", minus_dm.tail(10))  # Debug
-
-        # Directional Indicators (DI)
-        plus_di = 100 * (plus_dm.rolling(window=self.period, min_periods=1).sum() / atr)
-        minus_di = 100 * (minus_dm.rolling(window=self.period, min_periods=1).sum() / atr)
-
-        print("Plus DI:\n", plus_di.tail(10))  # Debug
-        print("Minus DI:\n", minus_di.tail(10))  # Debug
+        up = np.diff(h, prepend=np.nan)
+        down = -np.diff(l, prepend=np.nan)
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+
+        if debug:
+            self.logger.debug("Plus DM:\n%s", pd.Series(plus_dm, index=self._index).tail(10))
+            self.logger.debug("Minus DM:\n%s", pd.Series(minus_dm, index=self._index).tail(10))
+
+        # Directional Indicators (DI); no directional movement (or no range) counts as 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_di = np.where(atr == 0, 0.0, 100 * wilder_mean(plus_dm, self.period) / atr)
+            minus_di = np.where(atr == 0, 0.0, 100 * wilder_mean(minus_dm, self.period) / atr)
+            plus_di = pd.Series(plus_di, index=self._index)
+            minus_di = pd.Series(minus_di, index=self._index)
+
+        if debug:
+            self.logger.debug("Plus DI:\n%s", plus_di.tail(10))
+            self.logger.debug("Minus DI:\n%s", minus_di.tail(10))
 
         # DX (Directional Index) calculation
-        dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
-        dx.replace([np.inf, -np.inf], np.nan, inplace=True)  # Replace infinite values
-        dx.fillna(method='bfill', inplace=True)  # Fix NaN
+        di_sum = (plus_di + minus_di).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dx = np.where(di_sum == 0, 0.0, 100 * np.abs(plus_di.to_numpy() - minus_di.to_numpy()) / di_sum)
 
-        print("DX:\n", dx.tail(10))  # Debug
+        if debug:
+            self.logger.debug("DX:\n%s", pd.Series(dx, index=self._index).tail(10))
 
         # ADX calculation
-        adx = dx.rolling(window=self.period, min_periods=1).mean()
-        adx.fillna(method='bfill', inplace=True)  # Fix NaN
+        adx = pd.Series(wilder_mean(dx, self.period), index=self._index)
 
-        print("ADX Data:\n", adx.tail(10))  # Debug
+        if debug:
+            self.logger.debug("ADX Data:\n%s", adx.tail(10))
 
         return adx, plus_di, minus_di
 
     # 6. Calculate VTR (Volatility)
     def calculate_vtr(self):
-        return self.historical_data['close'].rolling(window=self.period).std()
+        return pd.Series(_rolling_std(self._close, self.period), index=self._index)
 
     # Signal Evaluation
     def evaluate_signals(self, rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr, stx):
-        # Remove NaN values from the series
-        rsi = rsi.dropna()
-        macd = macd.dropna()
-        signal_line = signal_line.dropna()
-        sma = sma.dropna()
-        upper_band = upper_band.dropna()
-        lower_band = lower_band.dropna()
-        adx = adx.dropna()
-        vtr = vtr.dropna()
-        stx = stx.dropna()
-        print("ADX Data:\n", adx.tail(10))
-        # Ensure there is valid data in each series before accessing the last element
-        if len(rsi) > 0:
-            print("rsi", rsi.iloc[-1])
-            rsi_signal = "Oversold" if rsi.iloc[-1] < 30 else "Overbought" if rsi.iloc[-1] > 70 else "Neutral"
+        # Only the latest valid value of each indicator is needed (the last two for the SMA slope)
+        rsi = _last_valid(rsi)
+        macd = _last_valid(macd)
+        signal_line = _last_valid(signal_line)
+        sma = _last_valid(sma, count=2)
+        upper_band = _last_valid(upper_band)
+        lower_band = _last_valid(lower_band)
+        adx = _last_valid(adx)
+        vtr = _last_valid(vtr)
+        stx = _last_valid(stx)
+        self.logger.debug("ADX Data: %s", adx)
+        # Ensure there is valid data in each indicator before using its last value
+        if rsi is not None:
+            self.logger.debug("rsi %s", rsi)
+            rsi_signal = "Oversold" if rsi < 30 else "Overbought" if rsi > 70 else "Neutral"
         else:
             rsi_signal = "No Data Available"
 
-        if len(macd) > 0 and len(signal_line) > 0:
-            print("macd",macd.iloc[-1])
-            macd_signal = "Bullish" if macd.iloc[-1] > signal_line.iloc[-1] else "Bearish"
+        if macd is not None and signal_line is not None:
+            self.logger.debug("macd %s", macd)
+            macd_signal = "Bullish" if macd > signal_line else "Bearish"
         else:
             macd_signal = "No Data Available"
 
-        if len(sma) > 1:
-            print("sma", sma.iloc[-1])
-            sma_signal = "Bullish" if sma.iloc[-1] > sma.iloc[-2] else "Bearish"
+        if sma is not None:
+            self.logger.debug("sma %s", sma[-1])
+            sma_signal = "Bullish" if sma[-1] > sma[-2] else "Bearish"
         else:
             sma_signal = "No Data Available"
 
-        if len(upper_band) > 0 and len(lower_band) > 0:
-            # print("bollingup"+str(upper_band)+"bolling low" +str(lower_band))
-            bollinger_signal = "Buy" if self.price < lower_band.iloc[-1] else "Sell" if self.price > upper_band.iloc[
-                -1] else "Neutral"
+        if upper_band is not None and lower_band is not None:
+            bollinger_signal = "Buy" if self.price < lower_band else "Sell" if self.price > upper_band else "Neutral"
         else:
             bollinger_signal = "No Data Available"
 
-        if len(adx) > 0:
-            adx_signal = "Strong Trend" if adx.iloc[-1] > 25 else "Weak Trend"
+        if adx is not None:
+            adx_signal = "Strong Trend" if adx > 25 else "Weak Trend"
         else:
             adx_signal = "No Data Available"
 
-        if len(vtr) > 0:
-            # print("vtr"+vtr)
-            vtr_signal = "High Volatility" if vtr.iloc[-1] > 1 else "Low Volatility"
+        if vtr is not None:
+            vtr_signal = "High Volatility" if vtr > 1 else "Low Volatility"
         else:
             vtr_signal = "No Data Available"
-        stochastic_signal = "Overbought" if stx.iloc[-1] > 80 else "Oversold" if stx.iloc[-1] < 20 else "Neutral"
-        return rsi_signal, macd_signal, sma_signal, bollinger_signal, adx_signal, vtr_signal
+        if stx is not None:
+            stochastic_signal = "Overbought" if stx > 80 else "Oversold" if stx < 20 else "Neutral"
+        else:
+            stochastic_signal = "No Data Available"
+        return rsi_signal, macd_signal, sma_signal, bollinger_signal, adx_signal, vtr_signal, stochastic_signal
 
     def calculate_stochastic_oscillator(self):
         """
         Calculate the Stochastic Oscillator.
         """
-        low_min = self.historical_data['low'].rolling(window=self.period).min()
-        high_max = self.historical_data['high'].rolling(window=self.period).max()
-        close_prices = self.historical_data['close']
-        # print("stoch", 100 * (close_prices - low_min) / (high_max - low_min))
-        return 100 * (close_prices - low_min) / (high_max - low_min)
+        low_min = rolling_min(self._low, self.period)
+        high_max = rolling_max(self._high, self.period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stochastic = 100 * (self._close - low_min) / (high_max - low_min)
+        return pd.Series(stochastic, index=self._index)
 
     # Risk Management: Position size calculation
     def calculate_position_size(self):
@@ -182,15 +253,27 @@ class MarketAnalyzer:
         return decision
 
     # Main method to run the analysis
-    def analyze(self):
-        # Calculate indicators
-        rsi = self.calculate_rsi()
-        macd, signal_line = self.calculate_macd()
-        sma = self.calculate_sma()
-        upper_band, lower_band = self.calculate_bollinger_bands()
-        adx, plus_di, minus_di = self.calculate_adx()  # Update here
-        vtr = self.calculate_vtr()
-        stx = self.calculate_stochastic_oscillator()
+    def analyze(self, plot=False):
+        # Too little history for the slowest indicator: hold without computing anything
+        if len(self._close) < max(self.period, _MACD_LONG_PERIOD) + _MACD_SIGNAL_PERIOD:
+            no_data = "No Data Available"
+            return {
+                'decision': "Hold",
+                'position_size': self.calculate_position_size(),
+                'stop_loss': self.calculate_stop_loss(),
+                'rsi_signal': no_data,
+                'macd_signal': no_data,
+                'sma_signal': no_data,
+                'bollinger_signal': no_data,
+                'adx_signal': no_data,
+                'vtr_signal': no_data,
+                'product_details': self.product_details
+            }
+
+        # Calculate all indicators in a single pass over the price arrays
+        rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr, stx = _indicators_kernel(
+            self._close, self._high, self._low, self.period
+        )
         # Evaluate signals
         rsi_signal, macd_signal, sma_signal, bollinger_signal, adx_signal, vtr_signal, stochastic_signal = self.evaluate_signals(
             rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr, stx
@@ -202,8 +285,12 @@ class MarketAnalyzer:
 
         # Make decision based on signals
         decision = self.make_decision(rsi_signal, macd_signal, sma_signal, bollinger_signal, adx_signal, vtr_signal)
-        # Plot indicators
-        self.plot_indicators(rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr)
+        # Plot indicators only on request; rendering blocks and is not needed for the decision
+        if plot:
+            self.plot_indicators(*(
+                pd.Series(values, index=self._index)
+                for values in (rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr)
+            ))
 
         # Return results
         return {
@@ -222,6 +309,8 @@ class MarketAnalyzer:
         # Separate method for plotting
 
     def plot_indicators(self, rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr):
+        import matplotlib.pyplot as plt  # Imported lazily, only plotting needs matplotlib
+
         fig, ax = plt.subplots(2, 1, figsize=(12, 10))
 
         # Plot RSI
@@ -239,6 +328,7 @@ class MarketAnalyzer:
 
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
 
 
 
@@ -1,22 +1,60 @@
 import pandas as pd
+import numpy as np
 import logging
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.coinbase_._numba_kernels import ewm_mean, rolling_min, rolling_max
+from app.utils.indicator_state import RollingRSIState, MACDState, SMAState, BollingerState
+from app.utils.tick_buffer import new_tick_buffer, append_tick, parse_timestamp, buffer_window
+
+# MACD periods served by the running EMAs
+_DEFAULT_MACD_PERIODS = (12, 26, 9)
+
+# Ticks needed before the indicators (the MACD signal line being the slowest) are worth running
+_MIN_TICKS = 26 + 9
 
 
 class WebSocketAnalyzer:
-    def __init__(self, risk_threshold=2, balance=10000, period=14, price=None):
+    def __init__(self, risk_threshold=2, balance=10000, period=14, price=None, capacity=500):
         self.risk_threshold = risk_threshold  # Risk threshold in percentage
         self.balance = balance  # User's account balance
         self.period = period  # Lookback period for indicators (e.g., 14)
         self.price = price  # Current price of the asset (for position sizing)
-        self.historical_data = pd.DataFrame(columns=['close', 'high', 'low'])  # Data frame to hold historical data
+        self._buffer = new_tick_buffer(capacity)  # Ring buffer holding the latest `capacity` ticks
+        self._prices = None  # Chronological NumPy columns of the buffer, rebuilt only after new ticks
+        self._frame = None  # DataFrame of the same columns, built only when historical_data is read
+        # Incremental indicator state, advanced in O(1) per tick by update_data
+        self._rsi = RollingRSIState(period)
+        self._macd = MACDState()
+        self._sma = SMAState(period)
+        self._bollinger = BollingerState(period)
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def historical_data(self):
+        """
+        Buffered ticks as a DataFrame, built from the ring buffer on first use after an update.
+        """
+        if self._frame is None:
+            prices = self._price_arrays()
+            self._frame = pd.DataFrame({column: prices[column] for column in ('close', 'high', 'low')})
+        return self._frame
+
+    def _price_arrays(self):
+        """
+        Buffered ticks as a dict of float64 arrays, shared by every indicator until the next update.
+        """
+        if self._prices is None:
+            self._prices = buffer_window(self._buffer)
+        return self._prices
+
     def update_data(self, websocket_data):
         tickers = websocket_data.get('events', [])[0].get('tickers', [])
         if not tickers:
             self.logger.warning("No tickers found in WebSocket data.")
             return
 
+        ts = parse_timestamp(websocket_data.get('timestamp'))
         for ticker in tickers:
             close_price = float(ticker.get('price', 0))
             high_price = float(ticker.get('high_24_h', 0))
@@ -26,12 +64,26 @@ class WebSocketAnalyzer:
                 self.logger.warning("Received invalid close price.")
                 continue  # Skip invalid entries
 
-            new_row = pd.DataFrame({'close': [close_price], 'high': [high_price], 'low': [low_price]})
-            self.historical_data = pd.concat([self.historical_data, new_row], ignore_index=True).dropna()
+            append_tick(
+                self._buffer,
+                close=close_price,
+                high=high_price,
+                low=low_price,
+                volume=float(ticker.get('volume_24_h', 0)),
+                ts=ts
+            )
+            self._prices = None
+            self._frame = None
+            self._rsi.update(close_price)
+            self._macd.update(close_price)
+            self._sma.update(close_price)
+            self._bollinger.update(close_price)
 
     def analyze(self, websocket_data):
         # Update historical data from WebSocket batch
         self.update_data(websocket_data)
+        if self._macd.count < max(self.period, _MIN_TICKS):
+            return "NEUTRAL"  # Not enough data yet
 
         # Run all strategies
         strategy_results = self.run_strategies()
@@ -92,49 +144,44 @@ class WebSocketAnalyzer:
         """
         Calculate the RSI (Relative Strength Index) based on historical data.
         """
-        delta = self.historical_data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=self.period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=self.period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        if rsi.iloc[-1] > 70:
-            return "SELL"
-        elif rsi.iloc[-1] < 30:
-            return "BUY"
-        print("RSI:", rsi.iloc[-1])
+        rsi = self._rsi.value()
+        if rsi is not None:
+            if rsi > 70:
+                return "SELL"
+            elif rsi < 30:
+                return "BUY"
+        self.logger.debug("RSI: %s", rsi)
         return "NEUTRAL"
 
     def calculate_macd(self, short_period=12, long_period=26, signal_period=9):
         """
         Calculate the MACD (Moving Average Convergence Divergence).
         """
-        short_ema = self.historical_data['close'].ewm(span=short_period, adjust=False).mean()
-        long_ema = self.historical_data['close'].ewm(span=long_period, adjust=False).mean()
-        macd = short_ema - long_ema
-        signal_line = macd.ewm(span=signal_period, adjust=False).mean()
+        if (short_period, long_period, signal_period) == _DEFAULT_MACD_PERIODS:
+            # Default periods come straight from the running EMAs
+            macd, signal_line = self._macd.value()
+        else:
+            close = self._price_arrays()['close']
+            macd = ewm_mean(close, short_period) - ewm_mean(close, long_period)
+            signal_line = ewm_mean(macd, signal_period)
+            macd, signal_line = macd[-1], signal_line[-1]
 
-        if macd.iloc[-1] > signal_line.iloc[-1]:
+        if macd > signal_line:
             return "BUY"
-        elif macd.iloc[-1] < signal_line.iloc[-1]:
+        elif macd < signal_line:
             return "SELL"
-        print("macd:", macd.iloc[-1])
+        self.logger.debug("macd: %s", macd)
         return "NEUTRAL"
 
     def calculate_sma(self):
-        if len(self.historical_data) < self.period:
-            print(f"Not enough data for SMA. Required: {self.period}, Available: {len(self.historical_data)}")
-            return "NEUTRAL", None
-
-        sma_series = self.historical_data['close'].rolling(window=self.period).mean()
-
-        if sma_series.isna().all():
-            print("SMA calculation returned NaN. Check data integrity.")
+        latest_sma = self._sma.value()
+        if latest_sma is None:
+            self.logger.debug("Not enough data for SMA. Required: %s, Available: %s", self.period, len(self._sma.window))
             return "NEUTRAL", None
 
-        latest_price = self.historical_data['close'].iloc[-1]
-        latest_sma = sma_series.iloc[-1]
+        latest_price = self._sma.window[-1]
 
-        print(f"Latest Price: {latest_price}, Latest SMA: {latest_sma}")
+        self.logger.debug("Latest Price: %s, Latest SMA: %s", latest_price, latest_sma)
 
         return "BUY" if latest_price > latest_sma else "SELL", latest_sma
 
@@ -143,44 +190,43 @@ class WebSocketAnalyzer:
         Calculate the Bollinger Bands (Upper and Lower).
         """
         sma, sma_val = self.calculate_sma()
-        rolling_std = self.historical_data['close'].rolling(window=self.period).std()
 
         # Ensure both are numeric values
         if not isinstance(sma_val, (int, float)):
             self.logger.error(f"SMA is not a valid number: {sma}")
             return "Error"
 
-        if sma=="Neutral" and rolling_std.isna().any():
-            self.logger.error(f"Rolling standard deviation contains NaN values.")
-            return "Error"
-
+        rolling_std = self._bollinger.std()
         upper_band = sma_val + (rolling_std * num_std_dev)
         lower_band = sma_val - (rolling_std * num_std_dev)
 
-        if self.historical_data['close'].iloc[-1] < lower_band.iloc[-1]:
+        close = self._sma.window[-1]
+        if close < lower_band:
             return "BUY"
-        elif self.historical_data['close'].iloc[-1] > upper_band.iloc[-1]:
+        elif close > upper_band:
             return "SELL"
-        print("Bolinger buy case ",  lower_band.iloc[-1])
-        print("Bolinger sell case ", upper_band.iloc[-1])
+        self.logger.debug("Bolinger buy case %s", lower_band)
+        self.logger.debug("Bolinger sell case %s", upper_band)
         return "NEUTRAL"
 
     def calculate_adx(self):
         """
         Calculate the ADX (Average Directional Index).
         """
-        high = self.historical_data['high']
-        low = self.historical_data['low']
-        close = self.historical_data['close']
-
-        tr = pd.concat([high - low, abs(high - close.shift()), abs(low - close.shift())], axis=1).max(axis=1)
+        prices = self._price_arrays()
+        high, low, close = prices['high'], prices['low'], prices['close']
+
+        # True Range; fmax skips the missing previous close on the first row
+        prev_close = np.empty_like(close)
+        prev_close[:1] = np.nan
+        prev_close[1:] = close[:-1]
+        tr = pd.Series(np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)]))
         atr = tr.rolling(window=self.period).mean()
 
-        plus_dm = high.diff()
-        minus_dm = low.diff()
-
-        plus_dm = plus_dm.where(plus_dm > 0, 0)
-        minus_dm = minus_dm.where(minus_dm > 0, 0)
+        up = np.diff(high, prepend=np.nan)
+        down = np.diff(low, prepend=np.nan)
+        plus_dm = pd.Series(np.where(up > 0, up, 0.0))
+        minus_dm = pd.Series(np.where(down > 0, down, 0.0))
 
         plus_di = 100 * (plus_dm.rolling(window=self.period).sum() / atr)
         minus_di = 100 * (minus_dm.rolling(window=self.period).sum() / atr)
@@ -189,24 +235,34 @@ class WebSocketAnalyzer:
 
         if adx.iloc[-1] > 25:
             return "BUY"
-        print("adx", adx.iloc[-1])
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("adx %s", adx.iloc[-1])
         return "SELL"
 
     def calculate_vtr(self):
         """
         Calculate the Volatility (VTR).
         """
-        print("vtr", self.historical_data['close'].rolling(window=self.period).std())
-        return self.historical_data['close'].rolling(window=self.period).std()
+        close = self._price_arrays()['close']
+        # Rolling std of every full window over the shared price arrays, NaN until one exists
+        vtr = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            vtr[self.period - 1:] = sliding_window_view(close, self.period).std(axis=-1, ddof=1)
+        vtr = pd.Series(vtr)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("vtr %s", vtr)
+        return vtr
 
     def calculate_stochastic_oscillator(self):
         """
         Calculate the Stochastic Oscillator.
         """
-        low_min = self.historical_data['low'].rolling(window=self.period).min()
-        high_max = self.historical_data['high'].rolling(window=self.period).max()
-        close_prices = self.historical_data['close']
-        return 100 * (close_prices - low_min) / (high_max - low_min)
+        prices = self._price_arrays()
+        low_min = rolling_min(prices['low'], self.period)
+        high_max = rolling_max(prices['high'], self.period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stochastic = 100 * (prices['close'] - low_min) / (high_max - low_min)
+        return pd.Series(stochastic)
 
     def calculate_position_size(self):
         """
@@ -214,6 +270,6 @@ class WebSocketAnalyzer:
         """
         risk_amount = self.balance * self.risk_threshold / 100
         position_size = risk_amount / self.price
-        print("position", position_size)
+        self.logger.debug("position %s", position_size)
         return position_size
 
@@ -8,6 +8,10 @@ class Settings(BaseSettings):
     coinbase_api_key: str
     coinbase_api_secret: str
     open_api_key: str
+    # Risk alert emails (app/utils/email_notifier.py); use an App Password if 2FA is enabled
+    alert_from_email: str = ""
+    alert_email_password: str = ""
+    alert_to_email: str = ""
 
 
 # Initialize the settings instance
@@ -1,4 +1,5 @@
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
 from app.agents.data_fetcher_agent import DataFetcherAgent
 from app.coinbase_.market_analyser import MarketAnalyzer
 from app.config.config import settings
@@ -17,8 +18,6 @@ data_fetcher_agent = DataFetcherAgent(api_key=api_key, secret_api_key=api_secret
 query = ["ETH-USD", "BTC-USD"]
 result = data_fetcher_agent.fetch_data(query)
 
-# Store analysis results
-analysis_results = {}
 secret_api_key = settings.open_api_key
 # Initialize LangChain's ChatModel (using OpenAI)
 chat_model = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.7, openai_api_key=secret_api_key)
@@ -46,44 +45,56 @@ prompt = PromptTemplate(input_variables=["rsi_signal", "macd_signal", "sma_signa
 # Create the LLMChain that ties the prompt template and the chat model together
 llm_chain = LLMChain(prompt=prompt, llm=chat_model)
 
-# Iterate through each asset and perform analysis
-for symbol, data in result.get("multiple_product_details").items():
-    product_details = data['product_details']
-    historical_data_df = pd.DataFrame(data['historical_data'])  # Historical data as DataFrame
 
-    # Initialize MarketAnalyzer
+def _analyze_symbol(symbol, data):
+    """
+    Runs the market analysis for one asset.
+    """
+    product_details = data['product_details']
+    # Initialize MarketAnalyzer straight from the fetched NumPy columns
     analyzer = MarketAnalyzer(
-        historical_data=historical_data_df,
+        historical_data=data['historical_data'],
         product_details=product_details,
         portfolio_value=10000  # Example portfolio value
     )
 
     # Perform analysis
-    analysis_result = analyzer.analyze()
-
-    # Extract signals for LangChain
-    rsi_signal = analysis_result['rsi_signal']
-    macd_signal = analysis_result['macd_signal']
-    sma_signal = analysis_result['sma_signal']
-    bollinger_signal = analysis_result['bollinger_signal']
-    adx_signal = analysis_result['adx_signal']
-    vtr_signal = analysis_result['vtr_signal']
-
-    # Get recommendation from LangChain model based on the signals
-    recommendation = llm_chain.run({
-        "rsi_signal": rsi_signal,
-        "macd_signal": macd_signal,
-        "sma_signal": sma_signal,
-        "bollinger_signal": bollinger_signal,
-        "adx_signal": adx_signal,
-        "vtr_signal": vtr_signal
-    })
-
-    # Store the result for each asset
-    analysis_results[symbol] = {
+    return analyzer.analyze(plot=False)
+
+
+# Analyze the assets concurrently; the fused numba kernel runs with nogil=True, so the threads
+# overlap on the indicator math (the surrounding pandas/Python work still takes turns on the GIL)
+with ThreadPoolExecutor(max_workers=8) as executor:
+    futures = {
+        symbol: executor.submit(_analyze_symbol, symbol, data)
+        for symbol, data in result.get("multiple_product_details").items()
+    }
+    market_analyses = {symbol: future.result() for symbol, future in futures.items()}
+
+# Extract signals for LangChain
+llm_inputs = [
+    {
+        "rsi_signal": analysis_result['rsi_signal'],
+        "macd_signal": analysis_result['macd_signal'],
+        "sma_signal": analysis_result['sma_signal'],
+        "bollinger_signal": analysis_result['bollinger_signal'],
+        "adx_signal": analysis_result['adx_signal'],
+        "vtr_signal": analysis_result['vtr_signal']
+    }
+    for analysis_result in market_analyses.values()
+]
+
+# Get all recommendations from the LangChain model in one batch, sent concurrently
+llm_outputs = llm_chain.batch(llm_inputs, config={"max_concurrency": 8})
+
+# Store the result for each asset
+analysis_results = {
+    symbol: {
         **analysis_result,
-        'langchain_recommendation': recommendation  # Adding LangChain's recommendation
+        'langchain_recommendation': output[llm_chain.output_key]  # Adding LangChain's recommendation
     }
+    for (symbol, analysis_result), output in zip(market_analyses.items(), llm_outputs)
+}
 
 # Print the analysis results for each asset
 for symbol, result in analysis_results.items():
@@ -1,7 +1,17 @@
 import asyncio
 
+try:
+    import uvloop
+
+    uvloop.install()  # Faster event loop for the WebSocket stream
+except ImportError:  # uvloop is optional (and unavailable on Windows)
+    pass
+
 from app.agents.data_fetcher_agent import DataFetcherAgent
 from app.config.config import settings
+from app.utils.log_queue import configure_queue_logging
+
+configure_queue_logging()
 
 api_key = settings.coinbase_api_key
 secret_api_key = settings.coinbase_api_secret
@@ -5,6 +5,7 @@ from app.tools.strategy_tool import (
     rsi_tool, macd_tool, sma_tool, bollinger_tool,
     adx_tool, vtr_tool, risk_tool, stochastic_tool
 )
+from app.utils.strategy import IndicatorContext
 
 class AnalyzerAgent:
     def __init__(self, secret_api_key: str):
@@ -41,16 +42,19 @@ class AnalyzerAgent:
         # Convert WebSocket data to a pandas DataFrame
         historical_data = pd.DataFrame([websocket_data])
 
+        # Extract the price columns once; every indicator tool reads the same arrays
+        context = IndicatorContext.from_data(historical_data)
+
         # Run all technical indicators through LangChain
         analysis_results = {
-            "RSI": rsi_tool._run(historical_data),
-            "MACD": macd_tool._run(historical_data),
-            "SMA": sma_tool._run(historical_data),
-            "Bollinger Bands": bollinger_tool._run(historical_data),
-            "ADX": adx_tool._run(historical_data),
-            "VTR (Volatility)": vtr_tool._run(historical_data),
+            "RSI": rsi_tool._run(context),
+            "MACD": macd_tool._run(context),
+            "SMA": sma_tool._run(context),
+            "Bollinger Bands": bollinger_tool._run(context),
+            "ADX": adx_tool._run(context),
+            "VTR (Volatility)": vtr_tool._run(context),
             "Risk Analysis": risk_tool._run(historical_data),
-            "Stochastic": stochastic_tool._run(historical_data)
+            "Stochastic": stochastic_tool._run(context)
         }
 
         # Determine BUY/SELL signal (at least 5 indicators for BUY, 4 for SELL)
@@ -1,7 +1,8 @@
+import asyncio
 from typing import Optional, Any, Callable
 
 from langchain.agents import Tool
-from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
 from langchain_core.runnables import RunnableConfig
 
 from app.coinbase_.data_fetcher import DataFetcher
@@ -9,9 +10,12 @@ from app.config.config import settings
 from app.models.models import InputParam
 
 class DataFetcherTool(Tool):
+    _fetcher: DataFetcher  # Coinbase client reused across calls (JWT cache, keep-alive session)
+
     def __init__(self, name: str, func: Optional[Callable], description: str, **kwargs: Any):
 
         super().__init__(name, func, description, **kwargs)
+        self._fetcher = DataFetcher(api_key=settings.coinbase_api_key, api_secret=settings.coinbase_api_secret)
 
     def _run(
         self,
@@ -23,23 +27,57 @@ class DataFetcherTool(Tool):
         """
         Executes the tool by calling the DataFetcher's methods.
         """
+        return asyncio.run(self._fetch_once(kwargs.get('query', None)))
+
+    async def _arun(
+        self,
+        *args: Any,
+        config: Optional[RunnableConfig] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Executes the tool from async code without blocking the event loop.
+        The HTTP session stays open for the next call on the same loop; see aclose().
+        """
+        return await self._fetch(kwargs.get('query', None))
+
+    async def aclose(self):
+        """
+        Closes the fetcher's HTTP session.
+        """
+        await self._fetcher.close()
+
+    async def _fetch_once(self, query):
+        """
+        Fetches on the short-lived loop of a sync call and closes the session before that loop ends.
+        """
+        try:
+            return await self._fetch(query)
+        finally:
+            await self._fetcher.close()
+
+    async def _fetch(self, query):
+        """
+        Calls the async DataFetcher methods for a single product ID or a list of them.
+        """
         # Call the method to fetch data from the Coinbase API
-        query = kwargs.get('query', None)
         if query:
-            data_fetcher = DataFetcher(api_key=settings.coinbase_api_key, api_secret=settings.coinbase_api_secret)
+            data_fetcher = self._fetcher
             if isinstance(query, str):
-                product_details = data_fetcher.get_product_details(query)
                 input = InputParam(product_id=str(query),granularity="ONE_DAY")
-                historical_data = data_fetcher.fetch_historical_data(
-                    input
+                product_details, historical_data = await asyncio.gather(
+                    data_fetcher.get_product_details(query),
+                    data_fetcher.fetch_historical_data(input)
                 )
                 return {
                     "product_details": product_details,
                     "historical_data": historical_data
                 }
             elif isinstance(query, list):
-                multiple_product_details = data_fetcher.get_multiple_product_details_and_history(query,
-                                                                                                 granularity="ONE_DAY")
+                multiple_product_details = await data_fetcher.get_multiple_product_details_and_history(
+                    query, granularity="ONE_DAY"
+                )
                 return {"multiple_product_details": multiple_product_details}
         else:
             raise ValueError("Query parameter is required to fetch data.")
@@ -1,7 +1,9 @@
+from functools import partial
+
 from langchain.agents import Tool
 
 from app.utils.strategy import calculate_rsi, calculate_macd, calculate_sma, calculate_bollinger_bands, calculate_adx, \
-    calculate_vtr, check_risk, calculate_stochastic
+    calculate_vtr, check_risk, calculate_stochastic, calculate_all_indicators
 
 # Wrap RSI calculation as a tool
 rsi_tool = Tool(
@@ -58,3 +60,11 @@ stochastic_tool = Tool(
     func=calculate_stochastic,
     description="Calculates the Stochastic Oscillator (%K and %D)"
 )
+
+# Every indicator in one call: the price columns are extracted once and a single fused pass
+# replaces one tool round-trip per indicator
+all_indicators_tool = Tool(
+    name="All Indicators Tool",
+    func=partial(calculate_all_indicators, include_adx=True),
+    description="Calculates RSI, MACD, SMA, Bollinger Bands, ADX, VTR and the Stochastic Oscillator at once"
+)
@@ -0,0 +1,19 @@
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is pinned in requirements.txt; plain Python only for installs without it
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """
+        No-op stand-in for numba.njit so kernels still run when numba is not installed.
+        Supports both the bare @njit and the @njit(cache=True, ...) forms.
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
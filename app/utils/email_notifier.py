@@ -1,50 +1,122 @@
+import atexit
+import queue
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+from email.message import EmailMessage
 import logging
 
+from app.config.config import settings
 from app.utils.strategy import check_risk
 
+# Credentials come from the environment (.env) instead of being hard-coded
+from_email = settings.alert_from_email
+password = settings.alert_email_password
+alert_email = settings.alert_to_email
+smtp_server = "smtp.gmail.com"
+smtp_port = 587
+# Socket timeout for the SMTP connection, so an unreachable server fails an alert instead of stalling it
+smtp_timeout = 10
+# Longest interpreter exit waits for queued alerts before giving up on them (seconds)
+_SHUTDOWN_TIMEOUT = 30
 
-def send_email_alert(subject, body, to_email):
+# One authenticated SMTP connection shared by all alerts, opened on first use.
+# Only the worker thread and _shutdown touch it, so callers never wait on this lock
+_client = None
+_lock = threading.Lock()
+
+# Alerts are queued and sent by a single background worker so callers never block on SMTP
+_outbox = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()  # Guards starting the worker only
+
+
+def _get_client(reconnect=False):
     """
-    Function to send an email alert.
+    Returns the shared SMTP connection, doing the TCP + TLS + AUTH handshake only when
+    there is no open connection yet (or `reconnect` is set after the server dropped it).
     """
-    from_email = "20fe1a05b3@gmail.com"  # Replace with your email
-    password = "Daddy@9565"  # Use App Password if 2FA is enabled
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
+    global _client
+    with _lock:
+        if _client is not None and reconnect:
+            try:
+                _client.close()
+            except Exception:
+                pass
+            _client = None
+        if _client is None:
+            server = smtplib.SMTP(smtp_server, smtp_port, timeout=smtp_timeout)
+            server.starttls()  # Start TLS encryption
+            server.login(from_email, password)  # Log in to the SMTP server
+            _client = server
+        return _client
+
 
-    # Create the email content
-    msg = MIMEMultipart()
+def _deliver(subject, body, to_email):
+    # Alerts are short plain text, so a single-part text/plain message is enough
+    msg = EmailMessage()
     msg['From'] = from_email
     msg['To'] = to_email
     msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
+    msg.set_content(body)
 
     try:
-        # Establish a connection with the Gmail SMTP server
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()  # Start TLS encryption
-            server.login(from_email, password)  # Log in to the SMTP server
-            text = msg.as_string()  # Convert the message to string format
-            server.sendmail(from_email, to_email, text)  # Send the email
+        _get_client().send_message(msg)
+    except smtplib.SMTPServerDisconnected:
+        # The idle connection timed out on the server side; log in again and retry once
+        _get_client(reconnect=True).send_message(msg)
+
+
+def _send_worker():
+    while True:
+        alert = _outbox.get()
+        if alert is None:  # Sentinel queued by _shutdown after the last alert
+            return
+        try:
+            _deliver(*alert)
             logging.info("Email sent successfully.")
-    except Exception as e:
-        logging.error(f"Failed to send email: {e}")
+        except Exception as e:
+            logging.error(f"Failed to send email: {e}")
+
+
+def _shutdown():
+    """
+    Waits up to _SHUTDOWN_TIMEOUT for queued alerts to be sent, then closes the shared connection.
+    """
+    global _client
+    _outbox.put(None)
+    _worker.join(_SHUTDOWN_TIMEOUT)
+    if _worker.is_alive():
+        # Still stuck on the server; the daemon worker dies with the interpreter
+        logging.error("Email alerts still queued at exit were not sent.")
+        return
+    with _lock:
+        if _client is not None:
+            try:
+                _client.quit()
+            except Exception:
+                pass
+            _client = None
 
 
-# Example use case: Send alert if a certain loss threshold is hit
-balance = 5000
-price = 250
-risk_threshold = 2  # 2% risk threshold
-alert_email = "vsnreddy65@gmail.com"
+def send_email_alert(subject, body, to_email):
+    """
+    Function to send an email alert.
+    The alert is queued and sent in the background over the shared SMTP connection.
+    """
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_send_worker, name="email-alerts", daemon=True)
+                _worker.start()
+                atexit.register(_shutdown)
+    _outbox.put((subject, body, to_email))
 
 
 def check_risk_and_alert(balance, price, risk_threshold):
     result, position_size = check_risk(balance, price, risk_threshold)
 
-    if result == "Position Size" and 0.001 < 0.01:
+    if result == "Position Size" and position_size < 0.01:
         subject = "Risk Alert: Position Size Too Small"
         body = f"Risk threshold exceeded. Current position size: {position_size}. Consider taking action."
         send_email_alert(subject, body, alert_email)
@@ -52,5 +124,9 @@ def check_risk_and_alert(balance, price, risk_threshold):
         logging.info(f"Risk check passed: Position size: {position_size}")
 
 
-# Example check
-check_risk_and_alert(balance, price, risk_threshold)
+if __name__ == "__main__":
+    # Example use case: Send alert if a certain loss threshold is hit
+    balance = 5000
+    price = 250
+    risk_threshold = 2  # 2% risk threshold
+    check_risk_and_alert(balance, price, risk_threshold)
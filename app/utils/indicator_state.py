@@ -0,0 +1,263 @@
+import math
+from collections import deque
+
+
+class SMAState:
+    def __init__(self, period=14):
+        """
+        Simple moving average kept as a running sum over the last `period` closes.
+        """
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    def update(self, close):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(close)
+        self.total += close
+
+    def value(self):
+        if len(self.window) < self.period:
+            return None
+        return self.total / self.period
+
+    def signal(self):
+        sma = self.value()
+        if sma is None:
+            return "NEUTRAL", None  # Not enough data
+        return "BUY" if self.window[-1] > sma else "SELL", sma
+
+
+class EMAState:
+    def __init__(self, span):
+        """
+        Exponential moving average, same recursion as Series.ewm(span=span, adjust=False).
+        """
+        self.alpha = 2 / (span + 1)
+        self.ema = None
+
+    def update(self, close):
+        if self.ema is None:
+            self.ema = close
+        else:
+            self.ema = self.alpha * close + (1 - self.alpha) * self.ema
+
+    def value(self):
+        return self.ema
+
+
+class MACDState:
+    def __init__(self, short_period=12, long_period=26, signal_period=9):
+        """
+        MACD built from three running EMAs.
+        """
+        self.long_period = long_period
+        self.short_ema = EMAState(short_period)
+        self.long_ema = EMAState(long_period)
+        self.signal_ema = EMAState(signal_period)
+        self.count = 0
+
+    def update(self, close):
+        self.short_ema.update(close)
+        self.long_ema.update(close)
+        self.signal_ema.update(self.short_ema.value() - self.long_ema.value())
+        self.count += 1
+
+    def value(self):
+        return self.short_ema.value() - self.long_ema.value(), self.signal_ema.value()
+
+    def signal(self):
+        if self.count < self.long_period:
+            return "NEUTRAL", None  # Not enough data
+        macd, signal_line = self.value()
+        signal = "BUY" if macd > signal_line else "SELL" if macd < signal_line else "NEUTRAL"
+        return signal, macd
+
+
+class RSIState:
+    def __init__(self, period=14):
+        """
+        RSI with Wilder's smoothing: avg = (avg * (period - 1) + x) / period.
+        The first `period` changes are averaged to seed the recursion.
+        """
+        self.period = period
+        self.prev_close = None
+        self.count = 0  # Number of price changes seen
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close):
+        if self.prev_close is None:
+            self.prev_close = close
+            return
+        delta = close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        self.count += 1
+        if self.count <= self.period:
+            # Seed phase: plain average of the first `period` changes
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+    def value(self):
+        if self.count < self.period:
+            return None
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else None
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+    def signal(self):
+        rsi = self.value()
+        if rsi is None:
+            return "NEUTRAL", rsi
+        return "SELL" if rsi > 70 else "BUY" if rsi < 30 else "NEUTRAL", rsi
+
+
+class RollingRSIState:
+    def __init__(self, period=14):
+        """
+        RSI from simple rolling means of gains and losses, like rolling(window=period).mean()
+        over diff(). The first close contributes a zero change, as diff().where(...) does.
+        """
+        self.period = period
+        self.prev_close = None
+        self.changes = deque(maxlen=period)
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+
+    def update(self, close):
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        if len(self.changes) == self.period:
+            old = self.changes[0]
+            if old > 0:
+                self.gain_sum -= old
+            else:
+                self.loss_sum += old
+        self.changes.append(delta)
+        if delta > 0:
+            self.gain_sum += delta
+        else:
+            self.loss_sum -= delta
+
+    def value(self):
+        if len(self.changes) < self.period:
+            return None
+        if self.loss_sum <= 0:
+            return 100.0 if self.gain_sum > 0 else None
+        return 100 - 100 / (1 + self.gain_sum / self.loss_sum)
+
+
+class BollingerState:
+    def __init__(self, period=14, num_std_dev=2):
+        """
+        Bollinger Bands from a sliding-window Welford mean/variance.
+        """
+        self.period = period
+        self.num_std_dev = num_std_dev
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+
+    def update(self, close):
+        if len(self.window) < self.period:
+            self.window.append(close)
+            delta = close - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (close - self.mean)
+        else:
+            # Replace the oldest value with the new one in a single step
+            old = self.window[0]
+            self.window.append(close)
+            old_mean = self.mean
+            self.mean += (close - old) / self.period
+            self.m2 += (close - old) * (close - self.mean + old - old_mean)
+        self.m2 = max(self.m2, 0.0)
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.period - 1))
+
+    def value(self):
+        if len(self.window) < self.period:
+            return None
+        std = self.std()
+        return self.mean + std * self.num_std_dev, self.mean - std * self.num_std_dev
+
+    def signal(self):
+        bands = self.value()
+        if bands is None:
+            return "NEUTRAL", (None, None)  # Not enough data
+        upper_band, lower_band = bands
+        close = self.window[-1]
+        signal = "BUY" if close < lower_band else "SELL" if close > upper_band else "NEUTRAL"
+        return signal, bands
+
+
+class StochasticState:
+    def __init__(self, period=14, smooth_d=3):
+        """
+        Stochastic %K/%D with the rolling low minimum and high maximum kept in monotonic
+        deques of (value, index) pairs, so each tick costs O(1) amortized.
+        """
+        self.period = period
+        self.count = 0  # Ticks seen, used as the index of the next tick
+        self.lows = deque()  # Increasing lows; lows[0] is the window minimum
+        self.highs = deque()  # Decreasing highs; highs[0] is the window maximum
+        self.k_values = deque(maxlen=smooth_d)
+
+    def update(self, close, high, low):
+        index = self.count
+        self.count += 1
+        while self.lows and self.lows[-1][0] >= low:
+            self.lows.pop()
+        self.lows.append((low, index))
+        while self.highs and self.highs[-1][0] <= high:
+            self.highs.pop()
+        self.highs.append((high, index))
+        if self.lows[0][1] <= index - self.period:
+            self.lows.popleft()
+        if self.highs[0][1] <= index - self.period:
+            self.highs.popleft()
+
+        if self.count >= self.period:
+            lowest_low = self.lows[0][0]
+            spread = self.highs[0][0] - lowest_low
+            self.k_values.append(100 * (close - lowest_low) / spread if spread else math.nan)
+
+    def signal(self):
+        if self.count < self.period:
+            return "NEUTRAL", (None, None)  # Not enough data
+        k = self.k_values[-1]
+        # %D is undefined (NaN) until `smooth_d` values of %K exist, as with a rolling mean
+        d = sum(self.k_values) / len(self.k_values) if len(self.k_values) == self.k_values.maxlen else math.nan
+        signal = "BUY" if k > d else "SELL" if k < d else "NEUTRAL"
+        return signal, (k, d)
+
+
+class IndicatorStates:
+    def __init__(self, period=14):
+        """
+        Incremental RSI, MACD, SMA, Bollinger and Stochastic state for one streamed product.
+        """
+        self.rsi = RSIState(period)
+        self.macd = MACDState()
+        self.sma = SMAState(period)
+        self.bollinger = BollingerState(period)
+        self.stochastic = StochasticState(period)
+
+    def update(self, close, high=None, low=None):
+        """
+        Feeds one tick into every indicator in O(1).
+        """
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.sma.update(close)
+        self.bollinger.update(close)
+        if high is not None and low is not None:
+            self.stochastic.update(close, high, low)
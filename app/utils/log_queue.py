@@ -0,0 +1,24 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def configure_queue_logging(level=logging.INFO):
+    """
+    Routes all log records through a queue so the stream handler writes to stderr on a
+    background thread instead of blocking the event loop on every record.
+    Returns the started QueueListener; it is stopped (and flushed) at interpreter exit.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,59 +1,399 @@
-import pandas as pd
+import functools
+import math
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.utils._njit import njit
+
+# The kernels below declare their signatures, so numba compiles them eagerly at import, and
+# cache=True persists the machine code in __pycache__, so after the first run they load from
+# disk instead of re-JITing. nogil=True releases the GIL inside the kernels, so
+# compute_for_symbols scales across threads.
+
+# Results of recent calculate_* calls, so repeated tool calls on one DataFrame are O(1)
+_CACHE_SIZE = 128
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _collect(historical_data, columns=("close", "high", "low")):
+    """
+    Materializes a Polars LazyFrame, selecting only the price columns the indicators read.
+    Any other input (pandas or Polars DataFrame, dict of arrays) is returned unchanged.
+    """
+    if hasattr(historical_data, "collect"):
+        return historical_data.select(list(columns)).collect()
+    return historical_data
+
+
+def _column(historical_data, column):
+    """
+    Returns a column as a contiguous float64 array.
+    Lets the tools accept a pandas or Polars DataFrame, a Polars LazyFrame or a dict of
+    arrays from a tick buffer; float64 Polars columns without nulls convert without a copy.
+    """
+    historical_data = _collect(historical_data, (column,))
+    # Deliberately float64 even for the bounded indicators (RSI, Stochastic, Bollinger): they work
+    # on differences of nearby prices, and float32 spacing at BTC prices (~0.004) is of the order
+    # of a tick-to-tick move (0.01), which visibly shifts RSI on streamed ticks.
+    values = np.ascontiguousarray(historical_data[column], dtype=np.float64)
+    # The eager kernel signatures only accept writeable arrays; pandas can hand out read-only views
+    return values if values.flags.writeable else values.copy()
+
+
+class IndicatorContext:
+    """
+    The close/high/low columns extracted once per agent turn as contiguous float64 arrays, so
+    chained calculate_* tools skip the per-call DataFrame lookups and dtype coercion.
+    Columns can also be read by name (context['close']), so it goes wherever a frame does.
+    """
+    # __weakref__ keeps it usable as a cached_indicator key
+    __slots__ = ("close", "high", "low", "n", "__weakref__")
+
+    def __init__(self, close, high, low, n):
+        self.close = close
+        self.high = high
+        self.low = low
+        self.n = n
+
+    @classmethod
+    def from_data(cls, historical_data):
+        historical_data = _collect(historical_data)
+        close = _column(historical_data, 'close')
+        return cls(close, _column(historical_data, 'high'), _column(historical_data, 'low'), len(close))
+
+    def __getitem__(self, column):
+        return getattr(self, column)
+
+    def __contains__(self, column):
+        return column in ("close", "high", "low")
+
+
+def _fingerprint(historical_data):
+    """
+    Cheap content fingerprint of a price frame: its length, last index label and the last
+    close, high and low. Appending a row or rewriting the latest bar (a live candle) changes it.
+    """
+    close = np.asarray(historical_data['close'])
+    if close.size == 0:
+        return (0,)
+    index = getattr(historical_data, 'index', None)
+    last_bar = tuple(
+        np.asarray(historical_data[column])[-1] if column in historical_data else None
+        for column in ('high', 'low')
+    )
+    return (len(close), index[-1] if index is not None else None, close[-1]) + last_bar
+
+
+def cached_indicator(func):
+    """
+    Memoizes a calculate_* function per input frame, keyed on the frame's identity, its
+    fingerprint and the call arguments. Entries hold only a weak reference to the frame, and a
+    hit requires that same object to still be alive, so a recycled id() never matches.
+    The fingerprint only covers the last bar: mutating earlier rows of the same frame in place
+    is not detected, so pass a new frame (or a copy) after editing history.
+    Inputs that cannot be weakly referenced (dicts of arrays) and LazyFrames bypass the cache.
+    """
+    @functools.wraps(func)
+    def wrapper(historical_data, *args, **kwargs):
+        if hasattr(historical_data, "collect"):
+            return func(historical_data, *args, **kwargs)
+        try:
+            ref = weakref.ref(historical_data)
+            key = (func.__name__, id(historical_data), _fingerprint(historical_data), args,
+                   tuple(sorted(kwargs.items())))
+            hash(key)
+        except (TypeError, KeyError):
+            return func(historical_data, *args, **kwargs)
+
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0]() is historical_data:
+                _cache.move_to_end(key)
+                return entry[1]
+
+        result = func(historical_data, *args, **kwargs)
+        with _cache_lock:
+            _cache[key] = (ref, result)
+            if len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+def _midpoint(high, low, window, lag=0):
+    """
+    Midpoint of the highest high and lowest low over the `window` bars ending `lag` bars
+    before the latest one, i.e. the last value of a rolling Ichimoku line shifted by `lag`.
+    """
+    end = len(high) - lag
+    return (high[end - window:end].max() + low[end - window:end].min()) / 2
+
+
+@njit("f8(f8, f8, f8, i8)", cache=True, nogil=True)
+def _ewm_step(ema, price, alpha, gap):
+    """
+    One step of pandas' ewm(adjust=False) recursion after `gap` missing (NaN) prices, whose
+    weight still decays as in ignore_na=False: the previous EMA keeps (1 - alpha) ** (gap + 1).
+    """
+    old_weight = (1.0 - alpha) ** (gap + 1)
+    return (old_weight * ema + alpha * price) / (old_weight + alpha)
+
+
+@njit("UniTuple(f8, 2)(f8[:], i8, i8, i8)", cache=True, nogil=True)
+def _macd_last(close, short_period, long_period, signal_period):
+    """
+    Latest MACD and signal line values, running the three EMA recursions in one loop
+    without materializing the intermediate EMA arrays.
+    NaN closes are handled like pandas' ewm: the EMAs start at the first valid close, carry
+    over missing ones, and the signal line keeps smoothing the carried MACD.
+    """
+    alpha_short = 2.0 / (short_period + 1.0)
+    alpha_long = 2.0 / (long_period + 1.0)
+    alpha_signal = 2.0 / (signal_period + 1.0)
+    ema_short = np.nan
+    ema_long = np.nan
+    ema_signal = np.nan
+    gap = 0  # Missing closes since the last valid one
+    for i in range(len(close)):
+        price = close[i]
+        if math.isnan(ema_short):
+            if not math.isnan(price):
+                ema_short = ema_long = price
+                ema_signal = 0.0
+            continue
+        if math.isnan(price):
+            gap += 1
+        else:
+            ema_short = _ewm_step(ema_short, price, alpha_short, gap)
+            ema_long = _ewm_step(ema_long, price, alpha_long, gap)
+            gap = 0
+        ema_signal = alpha_signal * (ema_short - ema_long) + (1.0 - alpha_signal) * ema_signal
+    return ema_short - ema_long, ema_signal
+
+
+@njit("f8(f8[:], i8)", cache=True, nogil=True)
+def _rsi_last(close, period):
+    """
+    Latest RSI with Wilder's smoothing: the first `period` price changes are averaged to seed
+    avg_gain/avg_loss, then avg = (avg * (period - 1) + x) / period. Same values as RSIState.
+    Returns NaN until `period` changes exist or when prices never moved. A change to or from a
+    NaN close counts as no move, as the baseline's delta.where(...) did.
+    """
+    n = len(close)
+    if n <= period:
+        return np.nan
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if i <= period:
+            avg_gain += gain / period
+            avg_loss += loss / period
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else np.nan
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+@njit("f8(f8[:], i8)", cache=True, nogil=True)
+def _log_return(close, i):
+    """
+    Log return from close[i - 1] to close[i]; NaN when either price is not positive.
+    """
+    if close[i] <= 0 or close[i - 1] <= 0:
+        return np.nan
+    return math.log(close[i]) - math.log(close[i - 1])
+
 
+# Fixed parameters of the fused kernel (the calculate_* defaults)
+_MACD_SHORT, _MACD_LONG, _MACD_SIGNAL = 12, 26, 9
+_STOCHASTIC_SMOOTH_D = 3
 
+
+@njit("f8[:](f8[:], f8[:], f8[:], i8)", cache=True, nogil=True)
+def _compute_all_loop(close, high, low, period):
+    """
+    Computes the latest RSI, MACD, SMA, Bollinger, volatility and Stochastic values in a single
+    walk over the price buffer, keeping the running sums and EMAs in locals.
+    Returns [rsi, macd, macd_signal, sma, band_std, vtr, vtr_median, k, d]; NaN where undefined.
+    """
+    n = len(close)
+    out = np.full(9, np.nan)
+    alpha_short = 2.0 / (_MACD_SHORT + 1.0)
+    alpha_long = 2.0 / (_MACD_LONG + 1.0)
+    alpha_signal = 2.0 / (_MACD_SIGNAL + 1.0)
+    ema_short = np.nan
+    ema_long = np.nan
+    ema_signal = np.nan
+    gap = 0  # Missing closes since the last valid one
+    avg_gain = 0.0
+    avg_loss = 0.0
+    close_sum = 0.0
+    ret_mean = 0.0  # Sliding-window Welford state for the log returns
+    ret_m2 = 0.0
+    invalid_returns = 0  # Undefined log returns inside the current window
+    volatility = np.full(n, np.nan)
+    k_sum = 0.0
+    k_count = 0
+
+    for i in range(n):
+        price = close[i]
+
+        # MACD: EMA recursions over the whole buffer, with the same NaN handling as _macd_last
+        if math.isnan(ema_short):
+            if not math.isnan(price):
+                ema_short = ema_long = price
+                ema_signal = 0.0
+        else:
+            if math.isnan(price):
+                gap += 1
+            else:
+                ema_short = _ewm_step(ema_short, price, alpha_short, gap)
+                ema_long = _ewm_step(ema_long, price, alpha_long, gap)
+                gap = 0
+            ema_signal = alpha_signal * (ema_short - ema_long) + (1.0 - alpha_signal) * ema_signal
+
+        # SMA / Bollinger: sum of the last `period` closes
+        if i >= n - period:
+            close_sum += price
+
+        if i == 0:
+            continue
+
+        # RSI: Wilder-smoothed gains and losses, seeded with the mean of the first `period` changes
+        delta = price - close[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if i <= period:
+            avg_gain += gain / period
+            avg_loss += loss / period
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+
+        # Volatility: rolling std of log returns, valid once a full window of returns exists.
+        # A return touching a non-positive close is undefined: it enters the sums as 0 and every
+        # window containing it yields NaN, like pandas' rolling std over inf/NaN returns
+        ret = _log_return(close, i)
+        if math.isnan(ret):
+            invalid_returns += 1
+            ret = 0.0
+        if i <= period:
+            delta_ret = ret - ret_mean
+            ret_mean += delta_ret / i
+            ret_m2 += delta_ret * (ret - ret_mean)
+        else:
+            old = _log_return(close, i - period)
+            if math.isnan(old):
+                invalid_returns -= 1
+                old = 0.0
+            old_mean = ret_mean
+            ret_mean += (ret - old) / period
+            ret_m2 += (ret - old) * (ret - ret_mean + old - old_mean)
+        if i >= period and invalid_returns == 0:
+            volatility[i] = math.sqrt(max(ret_m2, 0.0) / (period - 1)) * math.sqrt(period)
+
+        # Stochastic: %K only for the last bars that feed %D
+        if i >= n - _STOCHASTIC_SMOOTH_D and i >= period - 1:
+            lowest_low = low[i - period + 1:i + 1].min()
+            highest_high = high[i - period + 1:i + 1].max()
+            spread = highest_high - lowest_low
+            k = 100.0 * (price - lowest_low) / spread if spread != 0 else np.nan
+            k_sum += k
+            k_count += 1
+            out[7] = k
+
+    if n > period:
+        if avg_loss > 0:
+            out[0] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            out[0] = 100.0
+    if n >= period:
+        sma = close_sum / period
+        out[3] = sma
+        sq = 0.0
+        for j in range(n - period, n):
+            sq += (close[j] - sma) ** 2
+        out[4] = math.sqrt(sq / (period - 1))
+        out[5] = volatility[n - 1]
+        valid = volatility[~np.isnan(volatility)]
+        if len(valid) > 0:
+            out[6] = np.median(valid)
+        if k_count == _STOCHASTIC_SMOOTH_D:
+            out[8] = k_sum / _STOCHASTIC_SMOOTH_D
+    out[1] = ema_short - ema_long
+    out[2] = ema_signal
+    return out
+
+
+@cached_indicator
 def calculate_rsi(historical_data, period=14):
-    if len(historical_data) < period:
-        return "NEUTRAL", None  # Not enough data
+    close = _column(historical_data, 'close')
+    if len(close) <= period:
+        return "NEUTRAL", None  # Not enough data: Wilder's seed needs `period` price changes
 
-    delta = historical_data['close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=period).mean()
-    loss = -delta.where(delta < 0, 0).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
+    rsi = _rsi_last(close, period)
 
-    signal = "SELL" if rsi.iloc[-1] > 70 else "BUY" if rsi.iloc[-1] < 30 else "NEUTRAL"
-    return signal, rsi.iloc[-1]
+    signal = "SELL" if rsi > 70 else "BUY" if rsi < 30 else "NEUTRAL"
+    return signal, rsi
 
 
+@cached_indicator
 def calculate_macd(historical_data, short_period=12, long_period=26, signal_period=9):
-    if len(historical_data) < long_period:
+    close = _column(historical_data, 'close')
+    if len(close) < long_period:
         return "NEUTRAL", None  # Not enough data
 
-    short_ema = historical_data['close'].ewm(span=short_period, adjust=False).mean()
-    long_ema = historical_data['close'].ewm(span=long_period, adjust=False).mean()
-    macd = short_ema - long_ema
-    signal_line = macd.ewm(span=signal_period, adjust=False).mean()
+    macd, signal_line = _macd_last(close, short_period, long_period, signal_period)
 
-    signal = "BUY" if macd.iloc[-1] > signal_line.iloc[-1] else "SELL" if macd.iloc[-1] < signal_line.iloc[-1] else "NEUTRAL"
-    return signal, macd.iloc[-1]
+    signal = "BUY" if macd > signal_line else "SELL" if macd < signal_line else "NEUTRAL"
+    return signal, macd
 
 
+@cached_indicator
 def calculate_sma(historical_data, period=14):
-    if len(historical_data) < period:
+    close = _column(historical_data, 'close')
+    if len(close) < period:
         return "NEUTRAL", None  # Not enough data
 
-    sma_series = historical_data['close'].rolling(window=period).mean()
-    latest_price = historical_data['close'].iloc[-1]
-    latest_sma = sma_series.iloc[-1]
+    # Only the latest SMA is returned, so the mean is taken over the last window alone
+    latest_sma = close[-period:].mean()
+    latest_price = close[-1]
 
     signal = "BUY" if latest_price > latest_sma else "SELL"
     return signal, latest_sma
 
 
+@cached_indicator
 def calculate_bollinger_bands(historical_data, period=14, num_std_dev=2):
-    if len(historical_data) < period:
+    close = _column(historical_data, 'close')
+    if len(close) < period:
         return "NEUTRAL", (None, None)  # Not enough data
 
-    sma = historical_data['close'].rolling(window=period).mean()
-    rolling_std = historical_data['close'].rolling(window=period).std()
+    # Only the latest bands are returned, so both moments come from the last window alone
+    window = close[-period:]
+    sma = window.mean()
+    rolling_std = window.std(ddof=1)
     upper_band = sma + (rolling_std * num_std_dev)
     lower_band = sma - (rolling_std * num_std_dev)
 
-    signal = "BUY" if historical_data['close'].iloc[-1] < lower_band.iloc[-1] else "SELL" if historical_data['close'].iloc[-1] > upper_band.iloc[-1] else "NEUTRAL"
-    return signal, (upper_band.iloc[-1], lower_band.iloc[-1])
+    signal = "BUY" if close[-1] < lower_band else "SELL" if close[-1] > upper_band else "NEUTRAL"
+    return signal, (upper_band, lower_band)
 
 
+@cached_indicator
 def calculate_adx(historical_data, period=14):
     """
     Calculate the Ichimoku Cloud strategy and generate a trading signal.
@@ -62,71 +402,164 @@ def calculate_adx(historical_data, period=14):
         historical_data (pd.DataFrame): DataFrame with 'high', 'low', 'close' columns.
 
     Returns:
-        tuple: (str) -> Trading signal ("BUY", "SELL", or "NEUTRAL")
+        tuple: (str, float) -> Trading signal ("BUY", "SELL", or "NEUTRAL") and the latest Tenkan-sen
     """
-    if len(historical_data) < 52:  # Need at least 52 periods for full Ichimoku calculation
+    historical_data = _collect(historical_data)
+    high = _column(historical_data, 'high')
+    low = _column(historical_data, 'low')
+    close = _column(historical_data, 'close')
+    if len(close) < 52:  # Need at least 52 periods for full Ichimoku calculation
         return "NEUTRAL", None  # Not enough data
 
-    # Calculate the Ichimoku lines
-    high_9 = historical_data['high'].rolling(window=9).max()
-    low_9 = historical_data['low'].rolling(window=9).min()
-    tenkan_sen = (high_9 + low_9) / 2  # Conversion line
-
-    high_26 = historical_data['high'].rolling(window=26).max()
-    low_26 = historical_data['low'].rolling(window=26).min()
-    kijun_sen = (high_26 + low_26) / 2  # Base line
-
-    high_52 = historical_data['high'].rolling(window=52).max()
-    low_52 = historical_data['low'].rolling(window=52).min()
-    senkou_span_b = (high_52 + low_52) / 2  # Senkou Span B
+    # Only the latest values are read, so each line is computed over its last window alone
+    tenkan_sen = _midpoint(high, low, 9)  # Conversion line
+    kijun_sen = _midpoint(high, low, 26)  # Base line
 
-    # Plotting Senkou Span A (midpoint of Tenkan and Kijun)
-    senkou_span_a = ((tenkan_sen + kijun_sen) / 2).shift(26)
-
-    chikou_span = historical_data['close'].shift(-26)  # Chikou Span
+    # Senkou Span A (midpoint of Tenkan and Kijun) is plotted 26 periods ahead,
+    # so its latest value comes from the windows ending 26 bars ago
+    senkou_span_a = (_midpoint(high, low, 9, 26) + _midpoint(high, low, 26, 26)) / 2
 
     # Trading Signal Logic
-    if historical_data['close'].iloc[-1] > senkou_span_a.iloc[-1] and tenkan_sen.iloc[-1] > kijun_sen.iloc[-1]:
+    if close[-1] > senkou_span_a and tenkan_sen > kijun_sen:
         signal = "BUY"
-    elif historical_data['close'].iloc[-1] < senkou_span_a.iloc[-1] and tenkan_sen.iloc[-1] < kijun_sen.iloc[-1]:
+    elif close[-1] < senkou_span_a and tenkan_sen < kijun_sen:
         signal = "SELL"
     else:
         signal = "NEUTRAL"
 
-    return signal, None
+    return signal, tenkan_sen
 
 
 
 
+@cached_indicator
 def calculate_vtr(historical_data, period=14):
-    if len(historical_data) < period:
+    close = _column(historical_data, 'close')
+    if len(close) < period:
         return "NEUTRAL", None  # Not enough data
 
-    log_returns = np.log(historical_data['close'] / historical_data['close'].shift(1))
-    volatility = log_returns.rolling(window=period).std() * np.sqrt(period)
+    # Log returns from one log pass and a subtraction, then the std of every full window of returns.
+    # A non-positive close gives -inf/NaN returns, so the windows holding it come out NaN without warnings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_close = np.log(close)
+        log_returns = np.subtract(log_close[1:], log_close[:-1])
+        if len(log_returns) < period:
+            volatility = np.empty(0)
+        else:
+            volatility = sliding_window_view(log_returns, period).std(axis=-1, ddof=1) * math.sqrt(period)
+    latest = volatility[-1] if volatility.size else np.nan
+    valid = volatility[~np.isnan(volatility)]
+    median = np.median(valid) if valid.size else np.nan
 
-    signal = "BUY" if volatility.iloc[-1] < volatility.median() else "SELL"
-    return signal, volatility.iloc[-1]
+    signal = "BUY" if latest < median else "SELL"
+    return signal, latest
 
 
+@cached_indicator
 def calculate_stochastic(historical_data, period=14, smooth_k=3, smooth_d=3):
-    if len(historical_data) < period:
+    close = _column(historical_data, 'close')
+    if len(close) < period:
         return "NEUTRAL", (None, None)  # Not enough data
 
-    lowest_low = historical_data['low'].rolling(window=period).min()
-    highest_high = historical_data['high'].rolling(window=period).max()
+    # Only the latest %K and %D are returned, so %K is computed for the last `smooth_d` bars only
+    start = max(len(close) - smooth_d - period + 1, 0)
+    lowest_low = sliding_window_view(_column(historical_data, 'low')[start:], period).min(axis=-1)
+    highest_high = sliding_window_view(_column(historical_data, 'high')[start:], period).max(axis=-1)
+    close = close[start + period - 1:]
 
-    k = 100 * (historical_data['close'] - lowest_low) / (highest_high - lowest_low)
-    d = k.rolling(window=smooth_d).mean()
+    # Flat windows (highest high == lowest low) give NaN instead of a division warning
+    spread = highest_high - lowest_low
+    k = np.divide(100 * (close - lowest_low), spread, out=np.full_like(spread, np.nan), where=spread != 0)
+    d = k.mean() if len(k) == smooth_d else np.nan  # Undefined until `smooth_d` values of %K exist
 
-    signal = "BUY" if k.iloc[-1] > d.iloc[-1] else "SELL" if k.iloc[-1] < d.iloc[-1] else "NEUTRAL"
-    return signal, (k.iloc[-1], d.iloc[-1])
+    signal = "BUY" if k[-1] > d else "SELL" if k[-1] < d else "NEUTRAL"
+    return signal, (k[-1], d)
 
 
-def check_risk(balance, price, risk_threshold=2):
-    if balance <= 0 or price <= 0:
-        return "Invalid Input", None
+def calculate_all_indicators(historical_data, period=14, num_std_dev=2, include_adx=False):
+    """
+    Runs RSI, MACD, SMA, Bollinger Bands, VTR and the Stochastic Oscillator in one fused pass.
+    Returns {name: (signal, value)} with the same signals and values as the calculate_* functions.
+    With `include_adx` the Ichimoku signal of calculate_adx is added under "ADX", reusing the
+    extracted price columns.
+    """
+    historical_data = _collect(historical_data)
+    close = _column(historical_data, 'close')
+    n = len(close)
+    if n == 0:
+        return {}
+    high = _column(historical_data, 'high')
+    low = _column(historical_data, 'low')
+    rsi, macd, macd_signal, sma, band_std, vtr, vtr_median, k, d = _compute_all_loop(close, high, low, period)
+    last_close = close[-1]
+
+    if n < period:
+        # Not enough data
+        results = {
+            "RSI": ("NEUTRAL", None),
+            "SMA": ("NEUTRAL", None),
+            "Bollinger Bands": ("NEUTRAL", (None, None)),
+            "VTR (Volatility)": ("NEUTRAL", None),
+            "Stochastic": ("NEUTRAL", (None, None)),
+        }
+    else:
+        upper_band = sma + band_std * num_std_dev
+        lower_band = sma - band_std * num_std_dev
+        results = {
+            "RSI": ("SELL" if rsi > 70 else "BUY" if rsi < 30 else "NEUTRAL", rsi),
+            "SMA": ("BUY" if last_close > sma else "SELL", sma),
+            "Bollinger Bands": (
+                "BUY" if last_close < lower_band else "SELL" if last_close > upper_band else "NEUTRAL",
+                (upper_band, lower_band)
+            ),
+            "VTR (Volatility)": ("BUY" if vtr < vtr_median else "SELL", vtr),
+            "Stochastic": ("BUY" if k > d else "SELL" if k < d else "NEUTRAL", (k, d)),
+        }
+
+    if n <= period:
+        results["RSI"] = ("NEUTRAL", None)  # Not enough data
+    if n < _MACD_LONG:
+        results["MACD"] = ("NEUTRAL", None)  # Not enough data
+    else:
+        results["MACD"] = ("BUY" if macd > macd_signal else "SELL" if macd < macd_signal else "NEUTRAL", macd)
+    if include_adx:
+        results["ADX"] = calculate_adx({"close": close, "high": high, "low": low}, period)
+    return results
 
-    risk_amount = balance * risk_threshold / 100
-    position_size = risk_amount / price
+
+def compute_for_symbols(data_by_symbol, max_workers=None, **kwargs):
+    """
+    Runs calculate_all_indicators for many symbols concurrently.
+    The numba kernels release the GIL, so a thread pool fans out without pickling the price data.
+    Extra keyword arguments are passed to calculate_all_indicators.
+    Returns {symbol: {name: (signal, value)}}.
+    """
+    if not data_by_symbol:
+        return {}
+    max_workers = max_workers or min(len(data_by_symbol), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            symbol: executor.submit(calculate_all_indicators, historical_data, **kwargs)
+            for symbol, historical_data in data_by_symbol.items()
+        }
+        return {symbol: future.result() for symbol, future in futures.items()}
+
+
+def check_risk(balance, price, risk_threshold=2):
+    """
+    Position size that risks `risk_threshold` percent of the balance at the given price.
+    Also accepts arrays of balances and/or prices (e.g. candidate positions when rebalancing);
+    the sizes are then computed in one vectorized expression, NaN where an input is not positive.
+    """
+    balance = np.asarray(balance, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    valid = (balance > 0) & (price > 0)
+    if valid.ndim == 0:
+        if not valid:
+            return "Invalid Input", None
+        return "Position Size", float(balance * risk_threshold / 100 / price)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position_size = np.where(valid, balance * risk_threshold / 100 / price, np.nan)
     return "Position Size", position_size
+
@@ -0,0 +1,63 @@
+import numpy as np
+
+# Price columns stored for every streamed product (structure-of-arrays layout)
+PRICE_COLUMNS = ("close", "high", "low", "volume")
+
+
+def new_tick_buffer(capacity=100):
+    """
+    Creates a preallocated ring buffer holding the latest ticks of one product.
+    """
+    buffer = {column: np.empty(capacity, dtype=np.float64) for column in PRICE_COLUMNS}
+    buffer["ts"] = np.empty(capacity, dtype=np.int64)
+    buffer["head"] = 0  # Slot the next tick is written to
+    buffer["n"] = 0  # Number of valid ticks in the buffer
+    return buffer
+
+
+def parse_timestamp(timestamp):
+    """
+    Converts a Coinbase ISO-8601 timestamp into nanoseconds since the epoch.
+    """
+    if not timestamp:
+        return 0
+    return int(np.datetime64(timestamp.rstrip("Z"), "ns").astype(np.int64))
+
+
+def append_tick(buffer, close, high, low, volume, ts):
+    """
+    Writes one tick into the ring buffer, overwriting the oldest one when full.
+    """
+    head = buffer["head"]
+    buffer["close"][head] = close
+    buffer["high"][head] = high
+    buffer["low"][head] = low
+    buffer["volume"][head] = volume
+    buffer["ts"][head] = ts
+
+    capacity = len(buffer["close"])
+    buffer["head"] = (head + 1) % capacity
+    buffer["n"] = min(buffer["n"] + 1, capacity)
+
+
+def latest_timestamp(buffer):
+    """
+    Returns the timestamp of the most recent tick.
+    """
+    return int(buffer["ts"][buffer["head"] - 1])
+
+
+def buffer_window(buffer, copy=False):
+    """
+    Returns the buffered ticks in chronological order as a dict of NumPy arrays.
+    Before the ring wraps these are views into the buffer (copied only if `copy` is set);
+    once it has wrapped, each column is stitched together with a single concatenate.
+    """
+    n = buffer["n"]
+    if n < len(buffer["close"]):
+        # The ring has not wrapped yet, so the first n slots are already ordered
+        if copy:
+            return {column: buffer[column][:n].copy() for column in PRICE_COLUMNS}
+        return {column: buffer[column][:n] for column in PRICE_COLUMNS}
+    head = buffer["head"]
+    return {column: np.concatenate((buffer[column][head:], buffer[column][:head])) for column in PRICE_COLUMNS}
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.coinbase_._numba_kernels import _indicators_kernel
+from app.coinbase_.market_analyser import MarketAnalyzer
+
+PRODUCT_DETAILS = {"price": "100", "volume_24h": "1000", "price_percentage_change_24h": "1.5"}
+
+
+def _analyzer(seed, n, period=9, rounded=False):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.standard_normal(n))
+    if rounded:
+        close = np.round(close)  # Flat stretches exercise the zero-range branches
+    historical_data = {
+        "close": close,
+        "high": close + np.abs(rng.standard_normal(n)),
+        "low": close - np.abs(rng.standard_normal(n)),
+    }
+    return MarketAnalyzer(PRODUCT_DETAILS, historical_data, portfolio_value=10000, period=period)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_fused_kernel_matches_per_indicator_methods(seed):
+    n = int(np.random.default_rng(seed).integers(40, 250))
+    analyzer = _analyzer(seed, n, period=9 if seed % 2 else 14, rounded=seed % 3 == 0)
+
+    rsi, macd, signal_line, sma, upper_band, lower_band, adx, vtr, stochastic = _indicators_kernel(
+        analyzer._close, analyzer._high, analyzer._low, analyzer.period
+    )
+    expected_macd, expected_signal = analyzer.calculate_macd()
+    expected_upper, expected_lower = analyzer.calculate_bollinger_bands()
+    expected = {
+        "rsi": (analyzer.calculate_rsi(), rsi),
+        "macd": (expected_macd, macd),
+        "signal_line": (expected_signal, signal_line),
+        "sma": (analyzer.calculate_sma(), sma),
+        "upper_band": (expected_upper, upper_band),
+        "lower_band": (expected_lower, lower_band),
+        "adx": (analyzer.calculate_adx()[0], adx),
+        "vtr": (analyzer.calculate_vtr(), vtr),
+        "stochastic": (analyzer.calculate_stochastic_oscillator(), stochastic),
+    }
+    for name, (series, fused) in expected.items():
+        np.testing.assert_allclose(fused, series.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_analyze_holds_until_enough_history():
+    result = _analyzer(0, 20).analyze()
+    assert result["decision"] == "Hold"
+    assert result["rsi_signal"] == "No Data Available"
+
+
+def test_analyze_returns_every_signal():
+    result = _analyzer(0, 200).analyze()
+    for key in ("rsi_signal", "macd_signal", "sma_signal", "bollinger_signal", "adx_signal", "vtr_signal"):
+        assert result[key] != "No Data Available"
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.indicator_state import IndicatorStates, RollingRSIState
+from app.utils.strategy import (
+    IndicatorContext, calculate_adx, calculate_all_indicators, calculate_bollinger_bands, calculate_macd, calculate_rsi, calculate_sma,
+    calculate_stochastic, calculate_vtr, compute_for_symbols,
+)
+
+INDIVIDUAL = {
+    "RSI": calculate_rsi,
+    "MACD": calculate_macd,
+    "SMA": calculate_sma,
+    "Bollinger Bands": calculate_bollinger_bands,
+    "VTR (Volatility)": calculate_vtr,
+    "Stochastic": calculate_stochastic,
+}
+
+
+def _prices(seed, n, rounded=False):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.standard_normal(n))
+    if rounded:
+        close = np.round(close)  # Flat stretches exercise the zero-loss / zero-spread branches
+    high = close + np.abs(rng.standard_normal(n))
+    low = close - np.abs(rng.standard_normal(n))
+    return {"close": close, "high": high, "low": low}
+
+
+def _values(value):
+    return np.array(value if isinstance(value, tuple) else (value,), dtype=float)
+
+
+def _assert_same(expected, actual):
+    expected_values, actual_values = _values(expected[1]), _values(actual[1])
+    np.testing.assert_allclose(actual_values, expected_values, rtol=1e-9, atol=1e-9, equal_nan=True)
+    if expected[0] != actual[0]:
+        # Only acceptable when the compared values tie to rounding (e.g. %K == %D)
+        assert np.isclose(expected_values[0], expected_values[-1], rtol=1e-12)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_fused_pass_matches_individual_indicators(seed):
+    n = int(np.random.default_rng(seed).integers(1, 120))
+    data = _prices(seed, n, rounded=seed % 4 == 0)
+    fused = calculate_all_indicators(data)
+    for name, func in INDIVIDUAL.items():
+        _assert_same(func(data), fused[name])
+
+
+def test_fused_pass_tolerates_a_zero_close():
+    data = _prices(1, 100)
+    data["close"][90] = 0.0
+    fused = calculate_all_indicators(data)
+    assert np.isnan(fused["VTR (Volatility)"][1])
+    _assert_same(calculate_vtr(data), fused["VTR (Volatility)"])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_macd_skips_nan_closes_like_pandas_ewm(seed):
+    data = _prices(seed, 80)
+    missing = np.random.default_rng(seed).random(80) < 0.1
+    missing[:seed % 4] = True  # Leading gaps too
+    data["close"][missing] = np.nan
+    close = pd.Series(data["close"])
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal_line = macd.ewm(span=9, adjust=False).mean()
+
+    signal, value = calculate_macd(data)
+    np.testing.assert_allclose(value, macd.iloc[-1], rtol=1e-9)
+    assert signal == ("BUY" if macd.iloc[-1] > signal_line.iloc[-1] else "SELL")
+    _assert_same((signal, value), calculate_all_indicators(data)["MACD"])
+
+
+def test_compute_for_symbols_matches_per_symbol_calls():
+    data_by_symbol = {f"SYM-{seed}": _prices(seed, 20 + 10 * seed) for seed in range(6)}
+    data_by_symbol["EMPTY"] = {"close": np.empty(0), "high": np.empty(0), "low": np.empty(0)}
+    results = compute_for_symbols(data_by_symbol, max_workers=3, include_adx=True)
+    assert results.keys() == data_by_symbol.keys()
+    for symbol, data in data_by_symbol.items():
+        expected = calculate_all_indicators(data, include_adx=True)
+        assert results[symbol].keys() == expected.keys()
+        for name in expected:
+            _assert_same(expected[name], results[symbol][name])
+    assert compute_for_symbols({}) == {}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_states_match_batch_indicators(seed):
+    data = _prices(seed, 80, rounded=seed % 3 == 0)
+    states = IndicatorStates()
+    for i in range(len(data["close"])):
+        states.update(data["close"][i], data["high"][i], data["low"][i])
+        window = {column: values[:i + 1] for column, values in data.items()}
+        # The state reports None where the batch functions report NaN for an undefined RSI
+        rsi = states.rsi.signal()
+        _assert_same(calculate_rsi(window), (rsi[0], np.nan if rsi[1] is None and i >= 14 else rsi[1]))
+        _assert_same(calculate_macd(window), states.macd.signal())
+        _assert_same(calculate_sma(window), states.sma.signal())
+        _assert_same(calculate_bollinger_bands(window), states.bollinger.signal())
+        _assert_same(calculate_stochastic(window), states.stochastic.signal())
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_rolling_rsi_state_matches_pandas_rolling_means(seed):
+    close = _prices(seed, 80, rounded=seed % 3 == 0)["close"]
+    delta = pd.Series(close).diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = (100 - 100 / (1 + gain / loss)).to_numpy()
+
+    state = RollingRSIState()
+    for i, price in enumerate(close):
+        state.update(price)
+        value = state.value()
+        np.testing.assert_allclose(np.nan if value is None else value, expected[i], rtol=1e-9, equal_nan=True)
+
+
+def test_cached_indicator_hits_on_the_same_frame():
+    frame = pd.DataFrame(_prices(2, 80))
+    assert calculate_sma(frame) is calculate_sma(frame)
+    assert calculate_stochastic(frame) is calculate_stochastic(frame)
+    context = IndicatorContext.from_data(frame)
+    assert calculate_adx(context) is calculate_adx(context)
+
+
+def test_cached_indicator_misses_when_the_last_bar_changes():
+    frame = pd.DataFrame(_prices(3, 80))
+    sma, stochastic, adx = calculate_sma(frame), calculate_stochastic(frame), calculate_adx(frame)
+
+    # A live candle: only the latest bar's high and low move
+    frame.loc[79, "high"] += 5
+    frame.loc[79, "low"] -= 5
+    assert calculate_stochastic(frame) != stochastic
+    assert calculate_stochastic(frame) == calculate_stochastic(frame.copy())
+    assert calculate_adx(frame) != adx
+    assert calculate_adx(frame) == calculate_adx(frame.copy())
+
+    frame.loc[79, "close"] = 500
+    assert calculate_sma(frame) != sma
+    assert calculate_sma(frame) == calculate_sma(frame.copy())
+
+    appended = pd.concat([frame, frame.tail(1)], ignore_index=True)
+    assert calculate_sma(appended) == calculate_sma(appended.copy())
+    assert calculate_adx(appended) == calculate_adx(appended.copy())
+
+
+def test_cached_indicator_bypasses_dicts():
+    data = _prices(4, 80)
+    first = calculate_sma(data)
+    data["close"][-1] = 500
+    assert calculate_sma(data) != first